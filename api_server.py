@@ -4,68 +4,176 @@ Reads pre-aggregated data from MySQL load_summary table (populated by process_da
 and GPU data from gpu_stats table.
 """
 
+import bisect
 import datetime
 import json
 import numpy as np
 import os
+import threading
 import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 
+import anyio.to_thread
 import pandas as pd
-from fastapi import FastAPI, Query
+from fastapi import FastAPI, Header, Query
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import Response
 from fastapi.staticfiles import StaticFiles
 from sqlalchemy import create_engine, text
 from zoneinfo import ZoneInfo
 
-from app.config import DB_CONFIG
+from app import archive
+from app.columnar import COLUMNAR_MEDIA_TYPE, encode as encode_columnar
+from app.cache import RedisBackend, ResponseCache
+from app.compression import PrecompressedResponse, compress_variants
+from app.downsample import envelope_indices
+from app.config import CACHE_MAX_BYTES, CACHE_REDIS_URL, DB_CONFIG, PROCESS_TABLE
 
 app = FastAPI()
 
-# Simple in-memory TTL cache — stores pre-serialized JSON bytes
-# Data updates every 5 min, so 2 min TTL is safe
-_cache = {}
-CACHE_TTL = 120  # seconds
+# Response cache: LRU under a byte budget, per-endpoint TTLs (data updates
+# every 5 min), and one computation per key however many requests miss at once.
+# With CACHE_REDIS_URL set it lives in Redis and is shared by all API workers.
+CACHE_TTL = 120  # seconds, for endpoints not listed below
+CACHE_TTLS = {
+    'slurm-efficiency': 600,   # finished jobs only; sacct is collected hourly
+    'users': 3600,
+    'process-history': 300,
+}
+_cache = ResponseCache(
+    CACHE_MAX_BYTES, CACHE_TTL, CACHE_TTLS,
+    backend=RedisBackend(CACHE_REDIS_URL) if CACHE_REDIS_URL else None,
+)
+
+
+def _cache_key(endpoint: str, start: str, end: str, fmt: str = 'json',
+               points: Optional[int] = None) -> str:
+    key = f"{endpoint}:{start}:{end}"
+    if points is not None:
+        key = f"{key}:{points}pt"
+    return key if fmt == 'json' else f"{key}:{fmt}"
+
+
+def _response_format(accept: Optional[str]) -> str:
+    """'columnar' if the client lists the columnar media type in Accept, else 'json'."""
+    return 'columnar' if accept and COLUMNAR_MEDIA_TYPE in accept else 'json'
+
+
+def _encode(data: dict, fmt: str = 'json') -> dict:
+    """Serialize data (JSON, or columnar per _response_format) and compress it once."""
+    if fmt == 'columnar':
+        body = encode_columnar(data)
+    else:
+        body = json.dumps(data, default=str).encode()
+    return compress_variants(body)
+
+
+def _cached_response(key: str, compute, fmt: str = 'json', timings: Optional[dict] = None) -> Response:
+    """Serve key from the cache. On a miss, take the payload pre-built by
+    refresh_hot_windows.py if there is one, else run compute() (once) to build it.
+
+    If `timings` is given, compute() records its phases there (name -> ms) and
+    they are sent back in a Server-Timing header; a response served from the
+    cache (or from another request's fill) reports just that."""
+    started = time.perf_counter()
+    body = _cached_body(key, compute, fmt, timings)
+    headers = {}
+    if timings is not None:
+        headers['Server-Timing'] = _server_timing(timings, (time.perf_counter() - started) * 1000)
+    return _response(body, fmt, headers)
+
+
+def _cached_body(key: str, compute, fmt: str = 'json', timings: Optional[dict] = None) -> dict:
+    """The cached body variants behind _cached_response."""
+    started = time.perf_counter()
+
+    def fill():
+        body = _materialized(key)
+        if body is not None:
+            if timings is not None:
+                timings['materialized'] = (time.perf_counter() - started) * 1000
+            return body
+        return _encode(compute(), fmt)
+
+    return _cache.get_or_compute(key, fill)
+
+
+# Payloads for the dashboard's default windows are rebuilt after every
+# aggregation run by refresh_hot_windows.py and published to the hot_payloads
+# table under their cache keys; a miss on one of these endpoints looks there
+# before computing. Rows older than this mean the refresher has stopped, and
+# are ignored.
+HOT_ENDPOINTS = ('overview', 'per-user', 'analytics', 'slurm-efficiency')
+HOT_PAYLOAD_MAX_AGE_MINUTES = 15
+
+
+def _materialized(key: str) -> Optional[dict]:
+    """Encoded variants of key as published by refresh_hot_windows.py, or None."""
+    if ResponseCache.endpoint(key) not in HOT_ENDPOINTS:
+        return None
+    try:
+        with get_engine().connect() as conn:
+            rows = conn.execute(text(
+                "SELECT encoding, body FROM hot_payloads WHERE cache_key = :key "
+                "AND updated_at >= NOW() - INTERVAL :age MINUTE"),
+                {'key': key, 'age': HOT_PAYLOAD_MAX_AGE_MINUTES}).fetchall()
+    except Exception:
+        return None  # table not created yet (refresher never ran), or DB hiccup
+    variants = {r.encoding: bytes(r.body) for r in rows}
+    return variants if 'identity' in variants else None
 
 
-def _cache_key(endpoint: str, start: str, end: str) -> str:
-    return f"{endpoint}:{start}:{end}"
+def _full_payload(endpoint: str, start_str: str, end_str: str, compute) -> dict:
+    """The window's full payload, decoded from its cached (or pre-built) JSON body."""
+    return json.loads(_cached_body(_cache_key(endpoint, start_str, end_str), compute)['identity'])
 
 
-def _cache_get_json(key: str) -> Optional[bytes]:
-    """Return cached JSON bytes, or None if miss/expired."""
-    entry = _cache.get(key)
-    if entry and time.time() - entry['time'] < CACHE_TTL:
-        return entry['json']
-    return None
+def _server_timing(timings: dict, total_ms: float) -> str:
+    metrics = [f"{name};dur={ms:.1f}" for name, ms in timings.items()]
+    if not metrics:
+        metrics.append('cache;desc="hit"')
+    metrics.append(f"total;dur={total_ms:.1f}")
+    return ', '.join(metrics)
 
 
-def _cache_set_json(key: str, data: dict) -> bytes:
-    """Serialize data to JSON bytes, cache it, and return the bytes."""
-    json_bytes = json.dumps(data, default=str).encode()
-    now = time.time()
-    if len(_cache) > 50:
-        expired = [k for k, v in _cache.items() if now - v['time'] > CACHE_TTL]
-        for k in expired:
-            del _cache[k]
-    _cache[key] = {'json': json_bytes, 'time': now}
-    return json_bytes
+def _response(body, fmt: str = 'json', headers: Optional[dict] = None) -> Response:
+    """Response for raw bytes or cached variants; the encoding is picked per request."""
+    if isinstance(body, bytes):
+        body = {'identity': body}
+    media_type = COLUMNAR_MEDIA_TYPE if fmt == 'columnar' else "application/json"
+    return PrecompressedResponse(body, media_type=media_type, headers={"Vary": "Accept", **(headers or {})})
 
 
-def _json_response(json_bytes: bytes) -> Response:
-    return Response(content=json_bytes, media_type="application/json")
+# Handlers that touch the database are plain `def`: FastAPI runs them on its
+# worker threadpool, so a slow query or pandas pass never blocks the event loop
+# (or the cheap endpoints queued behind it). The threadpool is sized to
+# API_THREADS at startup and the connection pool to match, so every busy thread
+# can hold a connection.
+API_THREADS = 16
+
+# Independent queries within one request (see _run_parallel) run on their own
+# pool: a handler thread waiting on them never holds a connection itself, and
+# can't starve the request threadpool of the workers its queries need.
+QUERY_THREADS = 16
+_query_pool = ThreadPoolExecutor(max_workers=QUERY_THREADS, thread_name_prefix='api-query')
 
 _engine = None
+_engine_lock = threading.Lock()
 
 
 def get_engine():
     global _engine
-    if _engine is None:
-        _engine = create_engine(
-            f"mysql+pymysql://{DB_CONFIG['user']}:{DB_CONFIG['password']}@"
-            f"{DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['database']}",
-            pool_recycle=3600,
-        )
+    with _engine_lock:
+        if _engine is None:
+            _engine = create_engine(
+                f"mysql+pymysql://{DB_CONFIG['user']}:{DB_CONFIG['password']}@"
+                f"{DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['database']}",
+                pool_recycle=3600,
+                pool_size=API_THREADS,
+                max_overflow=QUERY_THREADS,
+            )
     return _engine
 
 
@@ -122,8 +230,26 @@ def _query_df(sql: str, params: dict) -> pd.DataFrame:
     return df
 
 
+def _run_parallel(loaders: dict, timings: Optional[dict] = None) -> dict:
+    """Run independent {name: callable} loaders concurrently on the query pool.
+
+    Returns {name: result} in the order given; each loader's wall time (ms) is
+    added to `timings` under its name. A failing loader's exception is re-raised."""
+    def timed(load):
+        started = time.perf_counter()
+        return load(), (time.perf_counter() - started) * 1000
+
+    futures = {name: _query_pool.submit(timed, load) for name, load in loaders.items()}
+    results = {}
+    for name, future in futures.items():
+        results[name], ms = future.result()
+        if timings is not None:
+            timings[name] = ms
+    return results
+
+
 @app.get("/api/config")
-async def get_config():
+def get_config():
     engine = get_engine()
     with engine.connect() as conn:
         row = conn.execute(text("SELECT MIN(snapshot_datetime) FROM load_summary")).fetchone()
@@ -139,21 +265,32 @@ async def get_config():
     }
 
 
-def _cap_mem_at_host_limits(df):
+def _cap_mem_at_host_limits(df, snapshots=None):
     """Cap total memory per snapshot per host at the host's physical memory limit.
 
     RSS over-counts shared mmap'd memory (e.g. BLAST's nt database appears as
     full RSS in every process). When total reported memory exceeds what the host
-    physically has, scale all user values down proportionally.
+    physically has, scale all user values down proportionally. If df's mem is
+    summed over several 5-min snapshots per row (analytics reading a rollup),
+    `snapshots` is that count per row and the limit is scaled to match.
     """
     if df.empty:
         return
     mem_limits = df['host'].map({h: m for h, _, m in SERVERS})
+    if snapshots is not None:
+        mem_limits = mem_limits * snapshots
     group_total = df.groupby(['snapshot_datetime', 'host'])['mem'].transform('sum')
     scale = (mem_limits / group_total).clip(upper=1.0)
     df['mem'] = df['mem'] * scale
 
 
+def _split_by_host(df):
+    """Partition df by host in one pass: {host: that host's rows}."""
+    if df.empty:
+        return {}
+    return dict(tuple(df.groupby('host', sort=False)))
+
+
 def _resample_bucket(start_str: str, end_str: str) -> str:
     """Choose resample frequency based on date range size."""
     s = datetime.datetime.strptime(start_str, '%Y-%m-%d %H:%M:%S')
@@ -166,56 +303,365 @@ def _resample_bucket(start_str: str, end_str: str) -> str:
     return '5min'
 
 
-def _build_hover(grouped_df, hostname, sort_col, fmt_fn):
-    """Build hover text lists efficiently using pre-sorted groups."""
-    hover_dict = {}
-    # Sort entire df once, then iterate groups
-    sorted_df = grouped_df.sort_values(sort_col, ascending=False)
-    for ts, group in sorted_df.groupby('snapshot_datetime'):
-        parts = []
-        for _, row in group.head(15).iterrows():
-            parts.append(fmt_fn(hostname, row))
-        hover_dict[ts] = parts
-    return hover_dict
+def _analytics_bucket(start_str: str, end_str: str) -> str:
+    """Rollup granularity analytics can read for a range: its totals are exact
+    at any of them and its peaks are bucket averages, so longer ranges read
+    coarser rollups than the charts (which stop at _resample_bucket's 30min)."""
+    s = datetime.datetime.strptime(start_str, '%Y-%m-%d %H:%M:%S')
+    e = datetime.datetime.strptime(end_str, '%Y-%m-%d %H:%M:%S')
+    days = (e - s).total_seconds() / 86400
+    if days > 180:
+        return '1D'
+    elif days > 31:
+        return '2h'
+    return _resample_bucket(start_str, end_str)
+
+
+# Rollup tables maintained by process_data_job.py, coarsest first
+ROLLUP_TABLES = [
+    ('1D', 'load_summary_1d'),
+    ('2h', 'load_summary_2h'),
+    ('30min', 'load_summary_30m'),
+]
+# How long a table's first bucket is trusted before it is looked up again. It
+# only moves when backfill.py fills in history or retention trims it.
+FIRST_BUCKET_TTL = 300  # seconds
+_first_buckets = {}  # table -> (expires_at, MIN(snapshot_datetime) or None)
+
+
+def _first_bucket(table: str):
+    """MIN(snapshot_datetime) of `table`, cached for FIRST_BUCKET_TTL."""
+    cached = _first_buckets.get(table)
+    if cached is not None and cached[0] > time.monotonic():
+        return cached[1]
+    with get_engine().connect() as conn:
+        first = conn.execute(text(f"SELECT MIN(snapshot_datetime) FROM {table}")).scalar()
+    first = None if first is None else pd.Timestamp(first)
+    _first_buckets[table] = (time.monotonic() + FIRST_BUCKET_TTL, first)
+    return first
+
+
+def _rollup_covers(table: str, freq: str, start_str: str) -> bool:
+    """Whether `table` reaches back to start_str, or to the start of load_summary
+    if that is later. A rollup added to a running deployment only holds the
+    buckets written since, until backfill.py --rollups-only has filled in the
+    history before that; reading it then would silently drop that history."""
+    first = _first_bucket(table)
+    if first is None:
+        return False
+    if first <= pd.Timestamp(start_str).floor(freq):
+        return True
+    summary_first = _first_bucket('load_summary')
+    return summary_first is not None and first <= summary_first.floor(freq)
+
+
+def _summary_source(bucket: str, start_str: str):
+    """Return (freq, table): the coarsest summary table whose buckets tile
+    `bucket` and that is populated back to start_str."""
+    for freq, table in ROLLUP_TABLES:
+        if pd.Timedelta(bucket) % pd.Timedelta(freq) == pd.Timedelta(0) and _rollup_covers(table, freq, start_str):
+            return freq, table
+    return '5min', 'load_summary'
+
+
+def _per_snapshot_means(df: pd.DataFrame, bucket: str) -> pd.DataFrame:
+    """Sum df's cpu_norm and mem into `bucket`s per host/user/comm and divide
+    them by the host's 5-min snapshots in the bucket. Each row's `snapshots`
+    is its host's snapshot count at the row's own (finer) time."""
+    if df.empty:
+        return df.drop(columns='snapshots').assign(cpu_norm=0.0, mem=0.0)
+    per_host = df.drop_duplicates(['snapshot_datetime', 'host'])[['snapshot_datetime', 'host', 'snapshots']]
+    df = df.assign(snapshot_datetime=df['snapshot_datetime'].dt.floor(bucket))
+    per_host = per_host.assign(snapshot_datetime=per_host['snapshot_datetime'].dt.floor(bucket))
+    snapshots = per_host.groupby(['snapshot_datetime', 'host'])['snapshots'].sum()
+    df = df.groupby(['snapshot_datetime', 'host', 'username', 'comm'])[['cpu_norm', 'mem']].sum().reset_index()
+    n = snapshots.reindex(pd.MultiIndex.from_frame(df[['snapshot_datetime', 'host']])).to_numpy()
+    df['cpu_norm'] = df['cpu_norm'] / n
+    df['mem'] = df['mem'] / n
+    return df
+
 
+def _load_summary_df(start_str: str, end_str: str, bucket: str) -> pd.DataFrame:
+    """Per-(bucket, host, username, comm) cpu_norm and mem for the chart endpoints.
+
+    Both are averaged over the host's 5-min snapshots in each bucket (summed,
+    then divided by how many snapshots the host had there), so a steady load
+    charts at the same level whatever the bucket size. Memory is capped at the
+    host limit per 5-min snapshot. Buckets of 30min are read from the 30m
+    rollup instead of resampling raw 5-min rows; there the cap is applied to
+    the bucket averages rather than to each 5-min snapshot."""
+    freq, table = _summary_source(bucket, start_str)
+    params = {'start': start_str, 'end': end_str}
+    if table == 'load_summary':
+        df = _query_df(
+            "SELECT snapshot_datetime, host, username, comm, cpu_norm, rss, pss "
+            "FROM load_summary WHERE snapshot_datetime BETWEEN :start AND :end",
+            params
+        )
+        # Use PSS where available, fall back to RSS
+        if not df.empty:
+            df['mem'] = df['pss'].where(df['pss'] > 0, df['rss'])
+        else:
+            df['mem'] = 0.0
 
-@app.get("/api/overview")
-async def get_overview(
-    start: Optional[str] = Query(None),
-    end: Optional[str] = Query(None),
-):
-    start_str, end_str = _parse_dates(start, end)
-    ck = _cache_key('overview', start_str, end_str)
-    cached = _cache_get_json(ck)
-    if cached:
-        return _json_response(cached)
+        _cap_mem_at_host_limits(df)
 
-    bucket = _resample_bucket(start_str, end_str)
-    result = []
+        # Resample to larger buckets if needed
+        if bucket != '5min' and not df.empty:
+            df = _per_snapshot_means(df[['snapshot_datetime', 'host', 'username', 'comm', 'cpu_norm', 'mem']]
+                                     .assign(snapshots=1), bucket)
+        return df
 
-    # Get all load_summary data for the date range in one query
     df = _query_df(
-        "SELECT snapshot_datetime, host, username, comm, cpu_norm, rss, pss "
-        "FROM load_summary WHERE snapshot_datetime BETWEEN :start AND :end",
-        {'start': start_str, 'end': end_str}
+        "SELECT snapshot_datetime, host, username, comm, cpu_norm, mem, snapshots "
+        f"FROM {table} WHERE snapshot_datetime BETWEEN :start AND :end",
+        params
     )
+    df = _per_snapshot_means(df, bucket)
+    _cap_mem_at_host_limits(df)
+    return df
 
-    # Use PSS where available, fall back to RSS
-    if not df.empty:
-        df['mem'] = df['pss'].where(df['pss'] > 0, df['rss'])
-    else:
-        df['mem'] = 0.0
 
-    _cap_mem_at_host_limits(df)
+def _build_hover(grouped_df, hostname, sort_col, label, unit=''):
+    """Map each timestamp to hover lines for its top 15 (user, comm) rows by sort_col.
+
+    Ranking, string assembly and the split into per-timestamp lists are all
+    column-wise; nothing runs per row in Python."""
+    sorted_df = grouped_df.sort_values(sort_col, ascending=False, kind='stable')
+    top = sorted_df[sorted_df.groupby('snapshot_datetime').cumcount() < 15]
+    if top.empty:
+        return {}
+    lines = (
+        f"Host: {hostname}  user: " + top['username'].astype(str)
+        + f"  {label}: " + np.char.mod('%.2f', top[sort_col].to_numpy(dtype=float))
+        + f"{unit}  cmd: " + top['comm'].astype(str)
+    )
+    # Regroup by timestamp (stable, so each group keeps its ranking) and split
+    order = np.argsort(top['snapshot_datetime'].to_numpy(), kind='stable')
+    ts = top['snapshot_datetime'].to_numpy()[order]
+    lines = lines.to_numpy()[order]
+    starts = np.flatnonzero(np.r_[True, ts[1:] != ts[:-1]])
+    return dict(zip(pd.DatetimeIndex(ts[starts]), map(list, np.split(lines, starts[1:]))))
+
+
+def _jobs_live_at(jobs, timestamps):
+    """For each of the (sorted) timestamps, the jobs in `jobs` running at that instant.
+
+    Each job's [start_time, end_time] is mapped onto the timestamp array with two
+    binary searches, so the cost is O(jobs log buckets) plus the size of the
+    output rather than a scan of every job per bucket."""
+    out = [[] for _ in range(len(timestamps))]
+    if jobs is None or jobs.empty or not out:
+        return out
+    ts = np.asarray(timestamps, dtype='datetime64[ns]')
+    first = np.searchsorted(ts, jobs['start_time'].to_numpy(dtype='datetime64[ns]'), side='left')
+    stop = np.searchsorted(ts, jobs['end_time'].to_numpy(dtype='datetime64[ns]'), side='right')
+    for r, a, b in zip(jobs.itertuples(), first, stop):
+        if a >= b:
+            continue
+        job = {'user': r.username, 'jobid': r.job_id,
+               'cpus': int(r.alloc_cpus), 'mem_gb': round(float(r.req_mem_gb), 1)}
+        for k in range(a, b):
+            out[k].append(job)
+    return out
+
+
+# Peak-preserving downsampling (?points=, see app/downsample.py): the points a
+# series keeps are chosen on the values its chart is read for, and every other
+# per-point list of the series (timestamps, hover, ...) keeps the same points.
+MIN_POINTS = 16
+# More than any chart has pixels for; bounds the work one request can ask for
+MAX_POINTS = 10000
+# What OverviewTab and PerUserTab ask for (frontend/src/config.js CHART_POINTS);
+# warm_cache and refresh_hot_windows.py pre-build these keys
+CHART_POINTS = 1500
+OVERVIEW_PEAK_KEYS = {'cpu': 'values', 'mem': 'raw_values', 'gpu': 'utilization_pct', 'slurm': 'alloc_cpus'}
+# Flags whose every change is kept too, so ServerChart's drain bands start and end where they did
+OVERVIEW_EDGE_KEYS = {'slurm': 'drain'}
+
+
+def _take_points(series: dict, idx) -> dict:
+    return {k: [v[i] for i in idx] if isinstance(v, list) and k not in _WHOLE_SERIES_KEYS else v
+            for k, v in series.items()}
+
+
+def _downsample_overview(payload: dict, points: int) -> dict:
+    servers = []
+    for entry in payload['servers']:
+        entry = dict(entry)
+        for name, key in OVERVIEW_PEAK_KEYS.items():
+            series = entry[name]
+            if series is not None and len(series['timestamps']) > points:
+                keep = ()
+                if name in OVERVIEW_EDGE_KEYS:
+                    flag = np.asarray(series[OVERVIEW_EDGE_KEYS[name]])
+                    changes = np.flatnonzero(flag[1:] != flag[:-1])
+                    keep = np.concatenate([changes, changes + 1])
+                entry[name] = _take_points(series, envelope_indices(series[key], points, keep))
+        servers.append(entry)
+    return {**payload, 'servers': servers}
+
+
+def _downsample_per_user(payload: dict, points: int) -> dict:
+    """Per-user series stay stacked, so all users of a chart keep the points
+    chosen on the host's total."""
+    servers = []
+    for entry in payload['servers']:
+        entry = dict(entry)
+        for name in ('cpu_by_user', 'mem_by_user'):
+            chart = entry[name]
+            if chart is None or len(chart['timestamps']) <= points:
+                continue
+            total = np.sum([chart['series'][user] for user in chart['users']], axis=0)
+            idx = envelope_indices(total, points)
+            entry[name] = {
+                **chart,
+                'timestamps': [chart['timestamps'][i] for i in idx],
+                'series': {user: [values[i] for i in idx] for user, values in chart['series'].items()},
+            }
+        servers.append(entry)
+    return {**payload, 'servers': servers}
 
-    # Resample to larger buckets if needed
-    if bucket != '5min' and not df.empty:
-        df['snapshot_datetime'] = df['snapshot_datetime'].dt.floor(bucket)
-        df = df.groupby(['snapshot_datetime', 'host', 'username', 'comm']).agg(
-            cpu_norm=('cpu_norm', 'sum'),
-            mem=('mem', 'mean'),  # average memory across sub-buckets
-        ).reset_index()
 
+@app.get("/api/overview")
+def get_overview(
+    start: Optional[str] = Query(None),
+    end: Optional[str] = Query(None),
+    since: Optional[datetime.datetime] = Query(None),
+    points: Optional[int] = Query(None, ge=MIN_POINTS, le=MAX_POINTS),
+    accept: Optional[str] = Header(None),
+):
+    """Per-host time series for the window. With `since` (the newest timestamp
+    the client already has), only the points at or after it are returned; see
+    _overview_since. With `points`, every series is thinned to at most that
+    many points (a delta for `since` is short enough to be left alone)."""
+    start_str, end_str = _parse_dates(start, end)
+    fmt = _response_format(accept)
+    timings = {}
+    if since is not None:
+        started = time.perf_counter()
+        body = _encode(_overview_since(start_str, end_str, since.strftime('%Y-%m-%dT%H:%M:%S'), timings), fmt)
+        return _response(body, fmt, {'Server-Timing': _server_timing(timings, (time.perf_counter() - started) * 1000)})
+    ck = _cache_key('overview', start_str, end_str, fmt, points)
+    if points is not None:
+        return _cached_response(ck, lambda: _downsample_overview(_full_payload(
+            'overview', start_str, end_str, lambda: _overview_payload(start_str, end_str, timings)), points), fmt, timings)
+    return _cached_response(ck, lambda: _overview_payload(start_str, end_str, timings), fmt, timings)
+
+
+# Incremental overview (?since=). Per date window, the last full payload is
+# kept in memory and extended with just its newest buckets, so a dashboard poll
+# recomputes only the tail of the window and ships only the points it lacks.
+# Every bucket is computed independently of the others, so recomputing a tail
+# from a bucket boundary gives the same points a full computation would.
+OVERVIEW_WINDOWS = 4             # windows kept in memory (per API worker)
+OVERVIEW_EXTEND_SECS = 60        # a window's tail is recomputed at most this often
+OVERVIEW_REBUILD_SECS = 1800     # and the whole window rebuilt this often, for late rows
+OVERVIEW_TAIL = datetime.timedelta(hours=1)  # recomputed span before the newest point
+OVERVIEW_SERIES = ('cpu', 'mem', 'gpu', 'slurm')
+_WHOLE_SERIES_KEYS = ('reboots',)  # series lists not indexed by timestamp
+
+
+class _OverviewWindow:
+    """One window's overview payload, kept so polls can extend it instead of recomputing it."""
+
+    def __init__(self, payload: dict, bucket: str):
+        self.payload = payload  # replaced, never mutated, so readers need no lock
+        self.bucket = bucket
+        self.built = time.monotonic()
+        self.extended = None
+        self.lock = threading.Lock()
+
+
+_overview_windows = OrderedDict()
+_overview_windows_lock = threading.Lock()
+
+
+def _overview_since(start_str: str, end_str: str, since: str, timings: dict) -> dict:
+    """The window's overview restricted to points at or after `since` (an ISO
+    timestamp). The bucket at `since` itself is re-sent as it may have been
+    partial; reboots are always sent in full. Series with no such points are
+    null, meaning "unchanged" to the client."""
+    payload = _overview_window(start_str, end_str, timings)
+    servers = []
+    for entry in payload['servers']:
+        entry = dict(entry)
+        for name in OVERVIEW_SERIES:
+            entry[name] = _series_since(entry[name], since)
+        servers.append(entry)
+    return {'servers': servers, 'since': since}
+
+
+def _overview_window(start_str: str, end_str: str, timings: dict) -> dict:
+    """The window's current overview payload, extended with its newest buckets."""
+    key = (start_str, end_str)
+    with _overview_windows_lock:
+        window = _overview_windows.get(key)
+        if window is not None:
+            _overview_windows.move_to_end(key)
+    if window is None or time.monotonic() - window.built >= OVERVIEW_REBUILD_SECS:
+        started = time.perf_counter()
+        # the full payload usually comes straight from the cache or hot_payloads
+        payload = _full_payload('overview', start_str, end_str, lambda: _overview_payload(start_str, end_str))
+        window = _OverviewWindow(payload, _resample_bucket(start_str, end_str))
+        timings['window'] = (time.perf_counter() - started) * 1000
+        with _overview_windows_lock:
+            _overview_windows[key] = window
+            while len(_overview_windows) > OVERVIEW_WINDOWS:
+                _overview_windows.popitem(last=False)
+    with window.lock:
+        if window.extended is None or time.monotonic() - window.extended >= OVERVIEW_EXTEND_SECS:
+            started = time.perf_counter()
+            window.payload = _extend_overview(window.payload, start_str, end_str, window.bucket)
+            window.extended = time.monotonic()
+            timings['tail'] = (time.perf_counter() - started) * 1000
+    return window.payload
+
+
+def _extend_overview(payload: dict, start_str: str, end_str: str, bucket: str) -> dict:
+    """Recompute the last OVERVIEW_TAIL of payload (and anything newer) and splice it in."""
+    newest = max((entry[name]['timestamps'][-1] for entry in payload['servers']
+                  for name in OVERVIEW_SERIES if entry[name]), default=None)
+    tail_start = start_str
+    if newest is not None:
+        tail = (pd.Timestamp(newest) - OVERVIEW_TAIL).floor(bucket).strftime('%Y-%m-%d %H:%M:%S')
+        tail_start = max(tail, start_str)
+    tail = _overview_payload(tail_start, end_str, bucket=bucket)
+    servers = []
+    for entry, fresh in zip(payload['servers'], tail['servers']):
+        entry = dict(entry)
+        for name in OVERVIEW_SERIES:
+            entry[name] = _splice_series(entry[name], fresh[name])
+        servers.append(entry)
+    return {'servers': servers}
+
+
+def _splice_series(old: Optional[dict], new: Optional[dict]) -> Optional[dict]:
+    """old's points before new's first timestamp, followed by all of new's."""
+    if old is None or new is None:
+        return new if old is None else old
+    cut = bisect.bisect_left(old['timestamps'], new['timestamps'][0])
+    spliced = dict(new)
+    for k, v in old.items():
+        if k in _WHOLE_SERIES_KEYS:
+            spliced[k] = sorted(set(v) | set(new[k]))
+        elif isinstance(v, list):
+            spliced[k] = v[:cut] + new[k]
+    return spliced
+
+
+def _series_since(series: Optional[dict], since: str) -> Optional[dict]:
+    """series' points at or after `since`, or None if it has none."""
+    if series is None:
+        return None
+    i = bisect.bisect_left(series['timestamps'], since)
+    if i == len(series['timestamps']):
+        return None
+    return {k: v[i:] if isinstance(v, list) and k not in _WHOLE_SERIES_KEYS else v
+            for k, v in series.items()}
+
+
+def _overview_gpu(start_str: str, end_str: str, bucket: str) -> pd.DataFrame:
     # Get all GPU data for the date range (aggregate across gpu_index per timestamp)
     gpu_df = _query_df(
         "SELECT snapshot_datetime, host, "
@@ -239,7 +685,10 @@ async def get_overview(
             gpu_count=('gpu_count', 'max'),
             gpu_processes=('gpu_processes', 'first'),
         ).reset_index()
+    return gpu_df
 
+
+def _overview_alloc(start_str: str, end_str: str, bucket: str) -> pd.DataFrame:
     # Slurm per-node allocation (collected every minute by slurm_capacity_collector).
     # Always resample: rows are per-minute, chart buckets are >= 5min.
     alloc_df = _query_df(
@@ -265,7 +714,10 @@ async def get_overview(
             drain=('drain', 'max'),
             jobs=('jobs', 'last'),
         ).reset_index()
+    return alloc_df
+
 
+def _overview_reboots(start_str: str, end_str: str) -> dict:
     # Reboot instants per host: BootTime jumps forward between consecutive
     # minutes. Computed in SQL (LAG) off the raw per-minute rows so each marker
     # sits at the exact reboot time, independent of the chart bucket. The
@@ -284,7 +736,10 @@ async def get_overview(
     if not reboot_df.empty:
         for h, grp in reboot_df.groupby('host'):
             reboots_by_host[h] = grp['boot_time'].dt.strftime('%Y-%m-%dT%H:%M:%S').tolist()
+    return reboots_by_host
 
+
+def _overview_hist_jobs(start_str: str, end_str: str) -> dict:
     # Historical per-job reconstruction for the reservation hover. Buckets that
     # predate the squeue `jobs` collection (added 2026-07-17) have no per-job
     # breakdown, so rebuild it from sacct history (slurm_jobs): a job occupies
@@ -312,17 +767,30 @@ async def get_overview(
         hist_jobs['host'] = hist_jobs['host'].str.strip()
         for h, grp in hist_jobs.groupby('host'):
             hist_by_host[h] = grp
+    return hist_by_host
+
+
+def _overview_payload(start_str: str, end_str: str, timings: Optional[dict] = None,
+                      bucket: Optional[str] = None) -> dict:
+    """Per-host series for [start_str, end_str]. `bucket` overrides the one the
+    range implies, for recomputing the tail of a longer window."""
+    bucket = bucket or _resample_bucket(start_str, end_str)
+    result = []
 
-    def _hist_jobs_at(host, ts):
-        grp = hist_by_host.get(host)
-        if grp is None:
-            return []
-        live = grp[(grp['start_time'] <= ts) & (grp['end_time'] >= ts)]
-        return [
-            {'user': r.username, 'jobid': r.job_id,
-             'cpus': int(r.alloc_cpus), 'mem_gb': round(float(r.req_mem_gb), 1)}
-            for r in live.itertuples()
-        ]
+    # The five sources are independent, so they load concurrently, each on its
+    # own pooled connection
+    df, gpu_df, alloc_df, reboots_by_host, hist_by_host = _run_parallel({
+        'load_summary': lambda: _load_summary_df(start_str, end_str, bucket),
+        'gpu_stats': lambda: _overview_gpu(start_str, end_str, bucket),
+        'slurm_node_alloc': lambda: _overview_alloc(start_str, end_str, bucket),
+        'reboots': lambda: _overview_reboots(start_str, end_str),
+        'slurm_jobs': lambda: _overview_hist_jobs(start_str, end_str),
+    }, timings).values()
+    build_started = time.perf_counter()
+
+    df_by_host = _split_by_host(df)
+    alloc_by_host = _split_by_host(alloc_df)
+    gpu_by_host = _split_by_host(gpu_df)
 
     for hostname, cpu_limit, mem_limit in SERVERS:
         server_entry = {
@@ -336,9 +804,9 @@ async def get_overview(
             "slurm": None,
         }
 
-        host_df = df[df['host'] == hostname] if not df.empty else pd.DataFrame()
+        host_df = df_by_host.get(hostname)
 
-        if not host_df.empty:
+        if host_df is not None:
             # Pre-aggregate per-user-per-timestamp once for hover text
             user_by_time = host_df.groupby(['snapshot_datetime', 'username', 'comm']).agg(
                 cpu_norm=('cpu_norm', 'sum'), mem=('mem', 'sum')
@@ -348,10 +816,7 @@ async def get_overview(
             cpu_by_time = host_df.groupby('snapshot_datetime')['cpu_norm'].sum().reset_index()
             cpu_by_time = cpu_by_time.sort_values('snapshot_datetime')
 
-            cpu_hover = _build_hover(
-                user_by_time, hostname, 'cpu_norm',
-                lambda h, r: f"Host: {h}  user: {r['username']}  load: {r['cpu_norm']:.2f}  cmd: {r['comm']}"
-            )
+            cpu_hover = _build_hover(user_by_time, hostname, 'cpu_norm', 'load')
 
             server_entry["cpu"] = {
                 "timestamps": cpu_by_time['snapshot_datetime'].dt.strftime('%Y-%m-%dT%H:%M:%S').tolist(),
@@ -363,10 +828,7 @@ async def get_overview(
             mem_by_time = host_df.groupby('snapshot_datetime')['mem'].sum().reset_index()
             mem_by_time = mem_by_time.sort_values('snapshot_datetime')
 
-            mem_hover = _build_hover(
-                user_by_time, hostname, 'mem',
-                lambda h, r: f"Host: {h}  user: {r['username']}  mem: {r['mem']:.2f}G  cmd: {r['comm']}"
-            )
+            mem_hover = _build_hover(user_by_time, hostname, 'mem', 'mem', 'G')
 
             server_entry["mem"] = {
                 "timestamps": mem_by_time['snapshot_datetime'].dt.strftime('%Y-%m-%dT%H:%M:%S').tolist(),
@@ -376,87 +838,97 @@ async def get_overview(
             }
 
         # Slurm allocation data (only Slurm nodes have rows)
-        if not alloc_df.empty:
-            host_alloc = alloc_df[alloc_df['host'] == hostname].sort_values('snapshot_datetime')
-            if not host_alloc.empty:
-                jobs_list = [json.loads(j) for j in host_alloc['jobs']]
-                jobs_list = [
-                    jl if jl else (_hist_jobs_at(hostname, ts) if cpus > 0 else [])
-                    for jl, ts, cpus in zip(
-                        jobs_list,
-                        host_alloc['snapshot_datetime'],
-                        host_alloc['alloc_cpus'],
-                    )
-                ]
-                server_entry["slurm"] = {
-                    "timestamps": host_alloc['snapshot_datetime'].dt.strftime('%Y-%m-%dT%H:%M:%S').tolist(),
-                    "alloc_cpus": host_alloc['alloc_cpus'].round(1).tolist(),
-                    "alloc_mem_gb": host_alloc['alloc_mem_gb'].round(1).tolist(),
-                    "drain": host_alloc['drain'].astype(bool).tolist(),
-                    "reboots": reboots_by_host.get(hostname, []),
-                    "jobs": jobs_list,
-                }
+        host_alloc = alloc_by_host.get(hostname)
+        if host_alloc is not None:
+            host_alloc = host_alloc.sort_values('snapshot_datetime')
+            jobs_list = [json.loads(j) for j in host_alloc['jobs']]
+            missing = [i for i, (jl, cpus) in enumerate(zip(jobs_list, host_alloc['alloc_cpus']))
+                       if not jl and cpus > 0]
+            if missing:
+                hist = _jobs_live_at(hist_by_host.get(hostname),
+                                     host_alloc['snapshot_datetime'].to_numpy()[missing])
+                for i, jl in zip(missing, hist):
+                    jobs_list[i] = jl
+            server_entry["slurm"] = {
+                "timestamps": host_alloc['snapshot_datetime'].dt.strftime('%Y-%m-%dT%H:%M:%S').tolist(),
+                "alloc_cpus": host_alloc['alloc_cpus'].round(1).tolist(),
+                "alloc_mem_gb": host_alloc['alloc_mem_gb'].round(1).tolist(),
+                "drain": host_alloc['drain'].astype(bool).tolist(),
+                "reboots": reboots_by_host.get(hostname, []),
+                "jobs": jobs_list,
+            }
 
         # GPU data
-        if hostname in GPU_HOSTS and not gpu_df.empty:
-            host_gpu = gpu_df[gpu_df['host'] == hostname].sort_values('snapshot_datetime')
-            if not host_gpu.empty:
-                server_entry["gpu"] = {
-                    "timestamps": host_gpu['snapshot_datetime'].dt.strftime('%Y-%m-%dT%H:%M:%S').tolist(),
-                    "utilization_pct": host_gpu['utilization_pct'].round(1).tolist(),
-                    "memory_used_mb": host_gpu['memory_used_mb'].round(0).tolist(),
-                    "memory_total_mb": host_gpu['memory_total_mb'].round(0).tolist(),
-                    "gpu_count": host_gpu['gpu_count'].tolist(),
-                    "gpu_processes": host_gpu['gpu_processes'].fillna('').tolist(),
-                }
+        host_gpu = gpu_by_host.get(hostname)
+        if hostname in GPU_HOSTS and host_gpu is not None:
+            host_gpu = host_gpu.sort_values('snapshot_datetime')
+            server_entry["gpu"] = {
+                "timestamps": host_gpu['snapshot_datetime'].dt.strftime('%Y-%m-%dT%H:%M:%S').tolist(),
+                "utilization_pct": host_gpu['utilization_pct'].round(1).tolist(),
+                "memory_used_mb": host_gpu['memory_used_mb'].round(0).tolist(),
+                "memory_total_mb": host_gpu['memory_total_mb'].round(0).tolist(),
+                "gpu_count": host_gpu['gpu_count'].tolist(),
+                "gpu_processes": host_gpu['gpu_processes'].fillna('').tolist(),
+            }
 
         result.append(server_entry)
 
-    response = {"servers": result}
-    return _json_response(_cache_set_json(ck, response))
+    if timings is not None:
+        timings['build'] = (time.perf_counter() - build_started) * 1000
+    return {"servers": result}
+
+
+def _user_series(host_df, col, top_n=10):
+    """Per-user time series of `col` for one host: the top_n users by total,
+    the rest folded into 'other', as dense columns of a (timestamp x user) matrix."""
+    by_user = host_df.groupby(['snapshot_datetime', 'username'])[col].sum()
+    user_totals = by_user.groupby(level='username').sum().sort_values(ascending=False)
+    users = list(user_totals.index[:top_n])
+    if len(user_totals) > top_n:
+        names = by_user.index.get_level_values('username')
+        by_user = by_user.groupby([
+            by_user.index.get_level_values('snapshot_datetime'),
+            names.where(names.isin(users), 'other'),
+        ]).sum()
+        users.append('other')
+    matrix = by_user.unstack().reindex(columns=users).sort_index()
+    # Python's round() on each value (pandas' .round() can differ in the last
+    # digit), and 0 where the user has no row at that timestamp
+    return {
+        "timestamps": matrix.index.strftime('%Y-%m-%dT%H:%M:%S').tolist(),
+        "users": users,
+        "series": {user: [0 if v != v else round(v, 2) for v in matrix[user].tolist()] for user in users},
+    }
 
 
 @app.get("/api/per-user")
-async def get_per_user(
+def get_per_user(
     start: Optional[str] = Query(None),
     end: Optional[str] = Query(None),
+    points: Optional[int] = Query(None, ge=MIN_POINTS, le=MAX_POINTS),
+    accept: Optional[str] = Header(None),
 ):
     start_str, end_str = _parse_dates(start, end)
-    ck = _cache_key('per-user', start_str, end_str)
-    cached = _cache_get_json(ck)
-    if cached:
-        return _json_response(cached)
+    fmt = _response_format(accept)
+    ck = _cache_key('per-user', start_str, end_str, fmt, points)
+    if points is not None:
+        return _cached_response(ck, lambda: _downsample_per_user(_full_payload(
+            'per-user', start_str, end_str, lambda: _per_user_payload(start_str, end_str)), points), fmt)
+    return _cached_response(ck, lambda: _per_user_payload(start_str, end_str), fmt)
 
-    bucket = _resample_bucket(start_str, end_str)
 
-    df = _query_df(
-        "SELECT snapshot_datetime, host, username, comm, cpu_norm, rss, pss "
-        "FROM load_summary WHERE snapshot_datetime BETWEEN :start AND :end",
-        {'start': start_str, 'end': end_str}
-    )
-
-    # Use PSS where available, fall back to RSS
-    if not df.empty:
-        df['mem'] = df['pss'].where(df['pss'] > 0, df['rss'])
-    else:
-        df['mem'] = 0.0
-
-    _cap_mem_at_host_limits(df)
+def _per_user_payload(start_str: str, end_str: str) -> dict:
+    bucket = _resample_bucket(start_str, end_str)
 
-    # Resample to larger buckets if needed
-    if bucket != '5min' and not df.empty:
-        df['snapshot_datetime'] = df['snapshot_datetime'].dt.floor(bucket)
-        df = df.groupby(['snapshot_datetime', 'host', 'username', 'comm']).agg(
-            cpu_norm=('cpu_norm', 'sum'),
-            mem=('mem', 'mean'),
-        ).reset_index()
+    df = _load_summary_df(start_str, end_str, bucket)
 
     servers_result = []
     top_consumers = []
 
+    df_by_host = _split_by_host(df)
     for hostname, cpu_limit, mem_limit in SERVERS:
-        host_df = df[df['host'] == hostname] if not df.empty else pd.DataFrame()
-        if host_df.empty:
+        host_df = df_by_host.get(hostname)
+        if host_df is None:
             continue
 
         server_entry = {
@@ -467,124 +939,73 @@ async def get_per_user(
             "mem_by_user": None,
         }
 
-        # CPU by user
-        by_user = host_df.groupby(['snapshot_datetime', 'username'])['cpu_norm'].sum().reset_index()
-        user_totals = by_user.groupby('username')['cpu_norm'].sum().sort_values(ascending=False)
-        top_users = list(user_totals.index[:10])
-        if len(user_totals) > 10:
-            by_user.loc[~by_user['username'].isin(top_users), 'username'] = 'other'
-            by_user = by_user.groupby(['snapshot_datetime', 'username'])['cpu_norm'].sum().reset_index()
-            top_users.append('other')
-
-        all_ts = sorted(by_user['snapshot_datetime'].unique())
-        series = {}
-        for user in top_users:
-            ud = by_user[by_user['username'] == user].set_index('snapshot_datetime')
-            series[user] = [round(float(ud.loc[t, 'cpu_norm']), 2) if t in ud.index else 0 for t in all_ts]
-
-        server_entry["cpu_by_user"] = {
-            "timestamps": [t.strftime('%Y-%m-%dT%H:%M:%S') for t in all_ts],
-            "users": top_users,
-            "series": series,
-        }
+        server_entry["cpu_by_user"] = _user_series(host_df, 'cpu_norm')
+        server_entry["mem_by_user"] = _user_series(host_df, 'mem')
 
-        # Top consumers: CPU
+        # Top consumers: CPU and memory stats per user in one keyed aggregation
         agg = host_df.groupby('username').agg(
             avg_cpu=('cpu_norm', 'mean'),
             peak_cpu=('cpu_norm', 'max'),
-        ).reset_index()
-        for _, row in agg.iterrows():
-            top_consumers.append({
-                "server": hostname,
-                "user": row['username'],
-                "avg_cpu": round(float(row['avg_cpu']), 1),
-                "peak_cpu": round(float(row['peak_cpu']), 1),
-                "avg_mem": None,
-                "peak_mem": None,
-            })
-
-        # Memory by user
-        by_user_mem = host_df.groupby(['snapshot_datetime', 'username'])['mem'].sum().reset_index()
-        user_totals_mem = by_user_mem.groupby('username')['mem'].sum().sort_values(ascending=False)
-        top_users_mem = list(user_totals_mem.index[:10])
-        if len(user_totals_mem) > 10:
-            by_user_mem.loc[~by_user_mem['username'].isin(top_users_mem), 'username'] = 'other'
-            by_user_mem = by_user_mem.groupby(['snapshot_datetime', 'username'])['mem'].sum().reset_index()
-            top_users_mem.append('other')
-
-        all_ts_mem = sorted(by_user_mem['snapshot_datetime'].unique())
-        series_mem = {}
-        for user in top_users_mem:
-            ud = by_user_mem[by_user_mem['username'] == user].set_index('snapshot_datetime')
-            series_mem[user] = [round(float(ud.loc[t, 'mem']), 2) if t in ud.index else 0 for t in all_ts_mem]
-
-        server_entry["mem_by_user"] = {
-            "timestamps": [t.strftime('%Y-%m-%dT%H:%M:%S') for t in all_ts_mem],
-            "users": top_users_mem,
-            "series": series_mem,
-        }
-
-        # Top consumers: Memory — merge with existing CPU entries
-        agg_mem = host_df.groupby('username').agg(
             avg_mem=('mem', 'mean'),
             peak_mem=('mem', 'max'),
-        ).reset_index()
-        for _, row in agg_mem.iterrows():
-            existing = [c for c in top_consumers
-                        if c['server'] == hostname and c['user'] == row['username']]
-            if existing:
-                existing[0]['avg_mem'] = round(float(row['avg_mem']), 1)
-                existing[0]['peak_mem'] = round(float(row['peak_mem']), 1)
-            else:
-                top_consumers.append({
-                    "server": hostname,
-                    "user": row['username'],
-                    "avg_cpu": None,
-                    "peak_cpu": None,
-                    "avg_mem": round(float(row['avg_mem']), 1),
-                    "peak_mem": round(float(row['peak_mem']), 1),
-                })
+        )
+        top_consumers.extend(
+            {"server": hostname, "user": user, "avg_cpu": round(float(avg_cpu), 1),
+             "peak_cpu": round(float(peak_cpu), 1), "avg_mem": round(float(avg_mem), 1),
+             "peak_mem": round(float(peak_mem), 1)}
+            for user, avg_cpu, peak_cpu, avg_mem, peak_mem in agg.itertuples()
+        )
 
         servers_result.append(server_entry)
 
     top_consumers.sort(key=lambda x: x.get('peak_cpu') or 0, reverse=True)
-    response = {"servers": servers_result, "top_consumers": top_consumers}
-    return _json_response(_cache_set_json(ck, response))
+    return {"servers": servers_result, "top_consumers": top_consumers}
 
 
 @app.get("/api/analytics")
-async def get_analytics(
+def get_analytics(
     start: Optional[str] = Query(None),
     end: Optional[str] = Query(None),
 ):
     """Compute core-hours, GB-hours, server utilization, and top programs."""
     start_str, end_str = _parse_dates(start, end)
     ck = _cache_key('analytics', start_str, end_str)
-    cached = _cache_get_json(ck)
-    if cached:
-        return _json_response(cached)
+    return _cached_response(ck, lambda: _analytics_payload(start_str, end_str))
 
-    BUCKET_HOURS = 5 / 60  # each row represents a 5-minute bucket
 
-    df = _query_df(
-        "SELECT snapshot_datetime, host, username, comm, cpu_norm, rss, pss "
-        "FROM load_summary WHERE snapshot_datetime BETWEEN :start AND :end",
-        {'start': start_str, 'end': end_str}
-    )
+def _analytics_payload(start_str: str, end_str: str) -> dict:
+    BUCKET_HOURS = 5 / 60  # cpu_norm/mem below are sums over 5-minute rows
 
-    # Use PSS where available, fall back to RSS
-    if not df.empty:
-        df['mem'] = df['pss'].where(df['pss'] > 0, df['rss'])
+    # Long ranges read a rollup table: each row then sums `snapshots` 5-min
+    # snapshots, so totals stay exact and peaks are taken over bucket averages.
+    _, table = _summary_source(_analytics_bucket(start_str, end_str), start_str)
+    if table == 'load_summary':
+        df = _query_df(
+            "SELECT snapshot_datetime, host, username, comm, cpu_norm, rss, pss "
+            "FROM load_summary WHERE snapshot_datetime BETWEEN :start AND :end",
+            {'start': start_str, 'end': end_str}
+        )
+        # Use PSS where available, fall back to RSS
+        if not df.empty:
+            df['mem'] = df['pss'].where(df['pss'] > 0, df['rss'])
+        else:
+            df['mem'] = 0.0
+        df['snapshots'] = 1
     else:
-        df['mem'] = 0.0
+        df = _query_df(
+            "SELECT snapshot_datetime, host, username, comm, cpu_norm, mem, snapshots "
+            f"FROM {table} WHERE snapshot_datetime BETWEEN :start AND :end",
+            {'start': start_str, 'end': end_str}
+        )
 
-    _cap_mem_at_host_limits(df)
+    _cap_mem_at_host_limits(df, df['snapshots'])
 
     server_totals = []
+    df_by_host = _split_by_host(df)
     for hostname, cpu_limit, mem_limit in SERVERS:
-        host_df = df[df['host'] == hostname] if not df.empty else pd.DataFrame()
+        host_df = df_by_host.get(hostname)
 
-        if host_df.empty:
+        if host_df is None:
             server_totals.append({
                 "hostname": hostname, "cpu_limit": cpu_limit, "mem_limit": mem_limit,
                 "avg_cpu_pct": 0, "peak_cpu_pct": 0, "avg_mem_pct": 0, "peak_mem_pct": 0,
@@ -594,13 +1015,15 @@ async def get_analytics(
 
         # Aggregate per timestamp for server-level stats
         by_time = host_df.groupby('snapshot_datetime').agg(
-            cpu_total=('cpu_norm', 'sum'), mem_total=('mem', 'sum')
+            cpu_total=('cpu_norm', 'sum'), mem_total=('mem', 'sum'),
+            snapshots=('snapshots', 'max'),
         ).reset_index()
 
-        avg_cpu = float(by_time['cpu_total'].mean())
-        peak_cpu = float(by_time['cpu_total'].max())
-        avg_mem = float(by_time['mem_total'].mean())
-        peak_mem = float(by_time['mem_total'].max())
+        snapshots = by_time['snapshots'].sum()
+        avg_cpu = float(by_time['cpu_total'].sum() / snapshots)
+        peak_cpu = float((by_time['cpu_total'] / by_time['snapshots']).max())
+        avg_mem = float(by_time['mem_total'].sum() / snapshots)
+        peak_mem = float((by_time['mem_total'] / by_time['snapshots']).max())
 
         server_totals.append({
             "hostname": hostname,
@@ -620,14 +1043,10 @@ async def get_analytics(
         by_user = by_user.sort_values(ascending=False).head(20)
         by_user_server = df.groupby(['username', 'host'])['cpu_norm'].sum() * BUCKET_HOURS
         for user in by_user.index:
-            servers = {}
-            for (u, h), val in by_user_server.items():
-                if u == user:
-                    servers[h] = round(float(val), 1)
             users_by_cpu.append({
                 "user": user,
                 "core_hours": round(float(by_user[user]), 1),
-                "servers": servers,
+                "servers": by_user_server.loc[user].round(1).to_dict(),
             })
 
     # Top users by GB-hours
@@ -637,14 +1056,10 @@ async def get_analytics(
         by_user = by_user.sort_values(ascending=False).head(20)
         by_user_server = df.groupby(['username', 'host'])['mem'].sum() * BUCKET_HOURS
         for user in by_user.index:
-            servers = {}
-            for (u, h), val in by_user_server.items():
-                if u == user:
-                    servers[h] = round(float(val), 1)
             users_by_mem.append({
                 "user": user,
                 "gb_hours": round(float(by_user[user]), 1),
-                "servers": servers,
+                "servers": by_user_server.loc[user].round(1).to_dict(),
             })
 
     # Top programs by core-hours
@@ -677,11 +1092,11 @@ async def get_analytics(
         "server_utilization": server_totals,
         "top_programs": top_programs,
     }
-    return _json_response(_cache_set_json(ck, response))
+    return response
 
 
 @app.get("/api/slurm-efficiency")
-async def get_slurm_efficiency(
+def get_slurm_efficiency(
     start: Optional[str] = Query(None),
     end: Optional[str] = Query(None),
 ):
@@ -689,10 +1104,10 @@ async def get_slurm_efficiency(
     start_str, end_str = _parse_dates(start, end)
 
     ck = _cache_key('slurm-efficiency', start_str, end_str)
-    cached = _cache_get_json(ck)
-    if cached:
-        return _json_response(cached)
+    return _cached_response(ck, lambda: _slurm_efficiency_payload(start_str, end_str))
+
 
+def _slurm_efficiency_payload(start_str: str, end_str: str) -> dict:
     # Aggregate per user in SQL (one row per user) rather than pulling every job row into
     # pandas - the ~100k-row transfer was the slow part. Efficiency is size-weighted
     # (sum used / sum requested) so it equals Avg Used / Avg Requested.
@@ -754,29 +1169,27 @@ async def get_slurm_efficiency(
     user_summary.sort(key=lambda x: x['wasted_pct'], reverse=True)
     cpu_summary.sort(key=lambda x: x['cpu_wasted_pct'], reverse=True)
 
-    result = {"user_summary": user_summary, "cpu_summary": cpu_summary}
-    return _json_response(_cache_set_json(ck, result))
+    return {"user_summary": user_summary, "cpu_summary": cpu_summary}
 
 
 @app.get("/api/users")
-async def get_users():
+def get_users():
     """Return distinct usernames from the processes table."""
     ck = _cache_key('users', 'all', 'all')
-    cached = _cache_get_json(ck)
-    if cached:
-        return _json_response(cached)
+    return _cached_response(ck, _users_payload)
 
+
+def _users_payload() -> dict:
     df = _query_df(
         "SELECT DISTINCT username FROM load_summary ORDER BY username",
         {}
     )
     usernames = df['username'].tolist() if not df.empty else []
-    response = {"users": usernames}
-    return _json_response(_cache_set_json(ck, response))
+    return {"users": usernames}
 
 
 @app.get("/api/user-processes")
-async def get_user_processes(
+def get_user_processes(
     user: str = Query("all"),
     host: str = Query("all"),
     window: str = Query("active"),
@@ -793,10 +1206,12 @@ async def get_user_processes(
     biggest-memory processes of the window (the LIMIT 500 becomes the 500 biggest
     *matching* runs)."""
     ck = _cache_key(f'user-processes:{user}:{host}:{search}:{start}:{end}', window, '')
-    cached = _cache_get_json(ck)
-    if cached:
-        return _json_response(cached)
+    return _cached_response(
+        ck, lambda: _user_processes_payload(user, host, window, search, start, end))
+
 
+def _user_processes_payload(user: str, host: str, window: str, search: str,
+                            start: Optional[str], end: Optional[str]) -> dict:
     now = datetime.datetime.now(tz=ZoneInfo('America/Los_Angeles'))
     params = {}
 
@@ -865,7 +1280,7 @@ async def get_user_processes(
     df = _query_df(sql, params)
 
     if df.empty:
-        return _json_response(_cache_set_json(ck, {"processes": []}))
+        return {"processes": []}
 
     processes = []
     for _, row in df.iterrows():
@@ -884,12 +1299,11 @@ async def get_user_processes(
             "snapshot_count": int(row['snapshot_count']),
         })
 
-    response = {"processes": processes}
-    return _json_response(_cache_set_json(ck, response))
+    return {"processes": processes}
 
 
 @app.get("/api/process-history")
-async def get_process_history(
+def get_process_history(
     host: str = Query(...),
     pid: int = Query(...),
     start: Optional[str] = Query(None),
@@ -909,19 +1323,38 @@ async def get_process_history(
     end_str = end_dt.strftime('%Y-%m-%d %H:%M:%S')
 
     ck = _cache_key(f'process-history:{host}:{pid}', start_str, end_str)
-    cached = _cache_get_json(ck)
-    if cached:
-        return _json_response(cached)
+    return _cached_response(ck, lambda: _process_history_payload(host, pid, start_str, end_str))
+
+
+PROCESS_HISTORY_COLUMNS = ['comm', 'cputimes', 'rss', 'pss', 'vsz', 'thcount', 'etimes', 'ppid', 'args',
+                           'snapshot_time_epoch', 'snapshot_datetime']
+
 
+def _archived_process_history(host: str, pid: int, start_str: str, end_str: str):
+    """Split a history lookup where retention_job.py's archive of raw process
+    rows ends: returns (archived rows, start of the range left for MySQL)."""
+    until = archive.archived_until('processes')
+    start = datetime.datetime.strptime(start_str, '%Y-%m-%d %H:%M:%S')
+    if until is None or start >= until:
+        return None, start_str
+    # BETWEEN includes `end`; the archive reads a half-open range
+    end = datetime.datetime.strptime(end_str, '%Y-%m-%d %H:%M:%S') + datetime.timedelta(seconds=1)
+    df = archive.read('processes', start, min(end, until), PROCESS_HISTORY_COLUMNS, host=host, pid=pid)
+    return df.replace([np.inf, -np.inf], 0).fillna(0), until.strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _process_history_payload(host: str, pid: int, start_str: str, end_str: str) -> dict:
+    archived, mysql_start = _archived_process_history(host, pid, start_str, end_str)
     df = _query_df(
-        "SELECT comm, cputimes, rss, pss, vsz, thcount, etimes, ppid, args, "
-        "snapshot_time_epoch, snapshot_datetime "
-        "FROM processes "
+        f"SELECT {', '.join(PROCESS_HISTORY_COLUMNS)} "
+        f"FROM {PROCESS_TABLE} "
         "WHERE host = :host AND pid = :pid "
         "AND snapshot_datetime BETWEEN :start AND :end "
         "ORDER BY snapshot_datetime",
-        {'host': host, 'pid': pid, 'start': start_str, 'end': end_str}
+        {'host': host, 'pid': pid, 'start': mysql_start, 'end': end_str}
     )
+    if archived is not None and not archived.empty:
+        df = pd.concat([archived, df], ignore_index=True) if not df.empty else archived
 
     empty_response = {
         "timestamps": [], "cpu_cores": [], "mem_gb": [], "threads": [],
@@ -930,7 +1363,7 @@ async def get_process_history(
     }
 
     if df.empty:
-        return _json_response(_cache_set_json(ck, empty_response))
+        return empty_response
 
     df = df.sort_values('snapshot_datetime').reset_index(drop=True)
 
@@ -972,23 +1405,40 @@ async def get_process_history(
         "last_seen": str(last_row['snapshot_datetime']),
         "segments": num_segments,
     }
-    return _json_response(_cache_set_json(ck, response))
+    return response
 
 
 @app.get("/api/slurm-capacity")
-async def get_slurm_capacity():
+def get_slurm_capacity():
     """Live cluster capacity + per-user quota usage (slurm_live_snapshot, refreshed each minute by cron)."""
     df = _query_df("SELECT v FROM slurm_live_snapshot WHERE k = 'snapshot'", {})
     if df.empty:
-        return _json_response(json.dumps({"cluster": None, "users": [], "updated_at": None}).encode())
-    return _json_response(df.iloc[0]["v"].encode())
+        return _response(json.dumps({"cluster": None, "users": [], "updated_at": None}).encode())
+    return _response(df.iloc[0]["v"].encode())
+
+
+@app.get("/api/cache-stats")
+async def get_cache_stats():
+    """Response cache size and hit/miss/eviction counters, overall and per endpoint."""
+    return _cache.stats()
 
 
 @app.on_event("startup")
+def _default_dates():
+    """(start, end) the dashboard sends by default (frontend/src/App.jsx): the
+    dates of 14 days ago and now, which it takes in UTC (toISOString)."""
+    today = datetime.datetime.now(datetime.timezone.utc).date()
+    return (today - datetime.timedelta(days=14)).isoformat(), today.isoformat()
+
+
 async def warm_cache():
-    """Pre-populate cache for the default date range so first page load is fast."""
+    """Size the handler threadpool, then pre-populate the cache for the default
+    date range, as the overview tab requests it, so first page load is fast."""
+    anyio.to_thread.current_default_thread_limiter().total_tokens = API_THREADS
+    start, end = _default_dates()
     try:
-        await get_overview(start=None, end=None)
+        await run_in_threadpool(get_overview, start=start, end=end, since=None, points=CHART_POINTS,
+                                accept=COLUMNAR_MEDIA_TYPE)
     except Exception:
         pass  # don't block startup if DB is temporarily unavailable
 
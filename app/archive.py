@@ -0,0 +1,160 @@
+"""Cold archive for raw rows that have aged out of MySQL.
+
+retention_job.py exports old days of `processes` and `slurm_node_alloc` here
+before removing them from MySQL (with compact storage, processes_compact's rows
+go under `processes`, in the same columns). Each day is a directory of
+zstd-compressed Parquet files, one per host, sorted by snapshot_datetime:
+
+    ARCHIVE_DIR/<table>/day=2026-03-18/host=flor/part-0.parquet
+
+Days are archived oldest first, so everything before archived_until(table) is
+here and everything from it on is (still) in MySQL; readers split their range
+there (api_server's process history, process_data_job's backfill path).
+Re-exporting a day replaces it, so an export interrupted before its MySQL
+rows were removed is simply redone by the next run.
+"""
+import glob
+import os
+import shutil
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+from sqlalchemy import text
+
+from app.config import ARCHIVE_DIR
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # no archive: everything is read from MySQL
+    pa = None
+
+EXPORT_CHUNK_ROWS = 100_000
+# Span read per chunk by iter_chunks; files are time-sorted, so the row-group
+# statistics let each read skip the rest of the day
+READ_WINDOW = timedelta(hours=1)
+
+# Columns stored per table (host is the directory, not a column)
+if pa is not None:
+    SCHEMAS = {
+        'processes': pa.schema([
+            ('pid', pa.int32()), ('ppid', pa.int32()),
+            ('username', pa.string()), ('comm', pa.string()),
+            ('cputimes', pa.int64()), ('rss', pa.int64()), ('pss', pa.int64()), ('vsz', pa.int64()),
+            ('thcount', pa.int32()), ('etimes', pa.int64()),
+            ('bdstart', pa.string()), ('args', pa.string()),
+            ('snapshot_time_epoch', pa.int64()), ('snapshot_datetime', pa.timestamp('s')),
+        ]),
+        'slurm_node_alloc': pa.schema([
+            ('snapshot_datetime', pa.timestamp('s')),
+            ('alloc_cpus', pa.int32()), ('total_cpus', pa.int32()),
+            ('alloc_mem_gb', pa.float32()), ('total_mem_gb', pa.float32()),
+            ('state', pa.string()), ('boot_time', pa.timestamp('s')), ('jobs', pa.string()),
+        ]),
+    }
+    _PARTITIONING = ds.partitioning(pa.schema([('day', pa.string()), ('host', pa.string())]), flavor='hive')
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise RuntimeError("the pyarrow package is required for the raw-data archive")
+
+
+def _table_dir(table: str) -> str:
+    return os.path.join(ARCHIVE_DIR, table)
+
+
+def _day_dir(table: str, day: date) -> str:
+    return os.path.join(_table_dir(table), f"day={day.isoformat()}")
+
+
+def archived_days(table: str) -> list:
+    """Days of `table` in the archive, oldest first."""
+    days = []
+    for path in glob.glob(os.path.join(_table_dir(table), 'day=*')):
+        try:
+            days.append(date.fromisoformat(os.path.basename(path)[len('day='):]))
+        except ValueError:
+            continue  # an export in progress (day=...tmp)
+    return sorted(days)
+
+
+def archived_until(table: str):
+    """Start of the first day not in the archive, or None if nothing is archived."""
+    days = archived_days(table)
+    if not days:
+        return None
+    return datetime.combine(days[-1] + timedelta(days=1), datetime.min.time())
+
+
+def export_day(engine, table: str, day: date, source: str = None) -> int:
+    """Write `table`'s rows for `day` to the archive, replacing any earlier
+    export of it, and return how many there were. Rows are read from `source`
+    (default `table`; compact storage archives processes_compact as
+    `processes`) and streamed per host, so memory stays bounded by
+    EXPORT_CHUNK_ROWS."""
+    _require_pyarrow()
+    schema = SCHEMAS[table]
+    timestamps = [field.name for field in schema if pa.types.is_timestamp(field.type)]
+    source = source or table
+    params = {'s': day, 'e': day + timedelta(days=1)}
+    final = _day_dir(table, day)
+    tmp = final + '.tmp'
+    shutil.rmtree(tmp, ignore_errors=True)
+    rows = 0
+    with engine.connect() as conn:
+        hosts = conn.execute(text(
+            f"SELECT DISTINCT host FROM {source} WHERE snapshot_datetime >= :s AND snapshot_datetime < :e"
+        ), params).scalars().all()
+        conn = conn.execution_options(stream_results=True)
+        for host in hosts:
+            sql = text(f"SELECT {', '.join(schema.names)} FROM {source} "
+                       "WHERE host = :host AND snapshot_datetime >= :s AND snapshot_datetime < :e "
+                       "ORDER BY snapshot_datetime")
+            os.makedirs(os.path.join(tmp, f"host={host}"))
+            with pq.ParquetWriter(os.path.join(tmp, f"host={host}", 'part-0.parquet'), schema,
+                                  compression='zstd') as writer:
+                for chunk in pd.read_sql(sql, conn, params={**params, 'host': host},
+                                         parse_dates=timestamps, chunksize=EXPORT_CHUNK_ROWS):
+                    writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+                    rows += len(chunk)
+    shutil.rmtree(final, ignore_errors=True)
+    os.rename(tmp, final)
+    return rows
+
+
+def read(table: str, start, end, columns=None, **equals) -> pd.DataFrame:
+    """Archived rows of `table` with start <= snapshot_datetime < end (and
+    column == value for each keyword), sorted by snapshot_datetime."""
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    files = []
+    host = equals.get('host', '*')
+    day = start.date()
+    while day <= end.date():
+        files += glob.glob(os.path.join(_day_dir(table, day), f"host={host}", '*.parquet'))
+        day += timedelta(days=1)
+    if not files:
+        return pd.DataFrame(columns=columns)
+    _require_pyarrow()
+    dataset = ds.dataset(files, format='parquet', partitioning=_PARTITIONING,
+                         partition_base_dir=_table_dir(table))
+    condition = ((ds.field('snapshot_datetime') >= pa.scalar(start.to_pydatetime(), pa.timestamp('s')))
+                 & (ds.field('snapshot_datetime') < pa.scalar(end.to_pydatetime(), pa.timestamp('s'))))
+    for column, value in equals.items():
+        condition &= ds.field(column) == value
+    fetch = columns if columns is None or 'snapshot_datetime' in columns else columns + ['snapshot_datetime']
+    df = dataset.to_table(columns=fetch, filter=condition).to_pandas()
+    df = df.sort_values('snapshot_datetime', kind='stable', ignore_index=True)
+    return df if fetch is columns else df[columns]
+
+
+def iter_chunks(table: str, start, end, columns):
+    """read() of start..end in READ_WINDOW pieces, in time order."""
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    while start < end:
+        stop = min(start + READ_WINDOW, end)
+        chunk = read(table, start, stop, columns)
+        if not chunk.empty:
+            yield chunk
+        start = stop
@@ -0,0 +1,313 @@
+"""Bounded response cache for api_server.py.
+
+Entries are the encoded body variants of one response (see app/compression.py)
+keyed by api_server's cache keys, whose first ':'-separated part names the
+endpoint. ResponseCache expires them after a per-endpoint TTL, keeps them
+under a byte budget, and de-duplicates concurrent misses: while one request
+computes a key, other requests for the same key wait for its result instead of
+running the same queries again.
+
+Storage is pluggable:
+  MemoryBackend  in-process LRU; each API worker has its own copy
+  RedisBackend   one Redis (or Redis-compatible) server shared by every
+                 worker, so a payload is computed once for all of them;
+                 misses are also coalesced across workers with a Redis lock
+"""
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict, defaultdict
+
+try:
+    import redis
+except ImportError:  # MemoryBackend only
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+COUNTERS = ('hits', 'misses', 'coalesced', 'remote_fills', 'expired', 'evictions', 'too_large', 'errors')
+
+
+def _size(value) -> int:
+    return sum(len(v) for v in value.values()) if isinstance(value, dict) else len(value)
+
+
+class MemoryBackend:
+    """In-process LRU store under a byte budget."""
+
+    shared = False
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (value, expires_at, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def _drop(self, key):
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def get(self, key):
+        """Return (value or None, whether an expired entry was dropped)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None, False
+            if entry[1] <= time.monotonic():
+                self._drop(key)
+                return None, True
+            self._entries.move_to_end(key)
+            return entry[0], False
+
+    def set(self, key, value, ttl):
+        """Store value; return the keys evicted to make room."""
+        size = _size(value)
+        evicted = []
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (value, time.monotonic() + ttl, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                old_key = next(iter(self._entries))
+                self._drop(old_key)
+                evicted.append(old_key)
+        return evicted
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def info(self):
+        with self._lock:
+            return {'backend': 'memory', 'entries': len(self._entries), 'bytes': self._bytes}
+
+
+class RedisBackend:
+    """Store shared by all API workers in a Redis server.
+
+    Each entry is a hash of its variants with a TTL. The byte budget and LRU
+    eviction are the server's job (maxmemory + allkeys-lru, see
+    docker-compose-dash.yml). Redis errors are logged and treated as misses,
+    so the API keeps answering (uncached) if the server goes away."""
+
+    shared = True
+    LOCK_POLL_SECS = 0.05
+
+    def __init__(self, url, prefix='load-analyzer:cache:'):
+        if redis is None:
+            raise RuntimeError("the redis package is required for a Redis cache backend")
+        self.client = redis.Redis.from_url(url, socket_timeout=5)
+        self.prefix = prefix
+
+    def get(self, key):
+        data = self.client.hgetall(self.prefix + key)
+        if not data:
+            return None, False
+        return {k.decode(): v for k, v in data.items()}, False
+
+    def set(self, key, value, ttl):
+        name = self.prefix + key
+        pipe = self.client.pipeline()
+        pipe.delete(name)
+        pipe.hset(name, mapping=value)
+        pipe.pexpire(name, int(ttl * 1000))
+        pipe.execute()
+        return []
+
+    def acquire(self, key, timeout):
+        """Try to become the one worker computing key; return a token or None."""
+        token = uuid.uuid4().hex
+        if self.client.set(self.prefix + 'lock:' + key, token, nx=True, px=int(timeout * 1000)):
+            return token
+        return None
+
+    def release(self, key, token):
+        name = self.prefix + 'lock:' + key
+        if self.client.get(name) == token.encode():
+            self.client.delete(name)
+
+    def wait(self, key, timeout):
+        """Wait for another worker's fill of key; None if it gave up or timed out."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            value, _ = self.get(key)
+            if value is not None:
+                return value
+            if not self.client.exists(self.prefix + 'lock:' + key):
+                return self.get(key)[0]
+            time.sleep(self.LOCK_POLL_SECS)
+        return None
+
+    def clear(self):
+        for name in self.client.scan_iter(match=self.prefix + '*', count=500):
+            self.client.delete(name)
+
+    def info(self):
+        memory = self.client.info('memory')
+        return {
+            'backend': 'redis',
+            'bytes': memory.get('used_memory'),
+            'maxmemory': memory.get('maxmemory'),
+            'maxmemory_policy': memory.get('maxmemory_policy'),
+        }
+
+
+class _Flight:
+    """A computation in progress that other requests for the key can wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class ResponseCache:
+    """Thread-safe TTL cache over a backend, with counters and single-flight fills."""
+
+    # How long a worker may hold a key's fill lock / others wait for it
+    FILL_TIMEOUT_SECS = 120
+
+    def __init__(self, max_bytes, default_ttl, ttls=None, backend=None):
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.ttls = dict(ttls or {})
+        self.backend = backend if backend is not None else MemoryBackend(max_bytes)
+        self._flights = {}
+        self._lock = threading.Lock()
+        self._counters = defaultdict(lambda: defaultdict(int))  # endpoint -> counter -> n
+
+    @staticmethod
+    def endpoint(key: str) -> str:
+        return key.split(':', 1)[0]
+
+    def ttl(self, key: str) -> float:
+        return self.ttls.get(self.endpoint(key), self.default_ttl)
+
+    def _count(self, key, counter, n=1):
+        with self._lock:
+            self._counters[self.endpoint(key)][counter] += n
+
+    def _lookup(self, key):
+        try:
+            value, expired = self.backend.get(key)
+        except Exception as e:
+            logger.warning(f"cache get {key} failed: {e}")
+            self._count(key, 'errors')
+            return None
+        if expired:
+            self._count(key, 'expired')
+        return value
+
+    def get(self, key):
+        """Return the cached value, or None on a miss (counted either way)."""
+        value = self._lookup(key)
+        self._count(key, 'hits' if value is not None else 'misses')
+        return value
+
+    def set(self, key, value):
+        """Store value under the key's TTL. A value larger than the whole budget is not cached."""
+        if _size(value) > self.max_bytes:
+            self._count(key, 'too_large')
+            return
+        try:
+            evicted = self.backend.set(key, value, self.ttl(key))
+        except Exception as e:
+            logger.warning(f"cache set {key} failed: {e}")
+            self._count(key, 'errors')
+            return
+        for old_key in evicted:
+            self._count(old_key, 'evictions')
+
+    def _fill(self, key, compute):
+        """Compute key's value and cache it; on a shared backend only one worker
+        computes while the others wait for its result."""
+        if not self.backend.shared:
+            value = compute()
+            self.set(key, value)
+            return value
+        try:
+            token = self.backend.acquire(key, self.FILL_TIMEOUT_SECS)
+            if token is None:
+                value = self.backend.wait(key, self.FILL_TIMEOUT_SECS)
+                if value is not None:
+                    self._count(key, 'remote_fills')  # computed by another worker
+                    return value
+        except Exception as e:
+            logger.warning(f"cache lock {key} failed: {e}")
+            self._count(key, 'errors')
+            token = None
+        try:
+            value = compute()
+            self.set(key, value)
+            return value
+        finally:
+            if token is not None:
+                try:
+                    self.backend.release(key, token)
+                except Exception as e:
+                    logger.warning(f"cache unlock {key} failed: {e}")
+
+    def get_or_compute(self, key, compute):
+        """Return the cached value for key, or compute, cache and return it.
+
+        Concurrent callers missing on the same key share one compute() call;
+        if it raises, every waiter gets the exception and nothing is cached."""
+        value = self._lookup(key)
+        if value is not None:
+            self._count(key, 'hits')
+            return value
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+        self._count(key, 'misses' if leader else 'coalesced')
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            # a fill may have finished between the lookup above and taking the flight
+            flight.value = self._lookup(key)
+            if flight.value is None:
+                flight.value = self._fill(key, compute)
+            return flight.value
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self) -> dict:
+        """This worker's counters, overall and per endpoint, plus the backend's size."""
+        try:
+            info = self.backend.info()
+        except Exception as e:
+            info = {'backend': type(self.backend).__name__, 'error': str(e)}
+        with self._lock:
+            per_endpoint = {ep: dict(c) for ep, c in self._counters.items()}
+            in_flight = len(self._flights)
+        totals = dict.fromkeys(COUNTERS, 0)
+        for c in per_endpoint.values():
+            for name, n in c.items():
+                totals[name] += n
+        lookups = totals['hits'] + totals['misses'] + totals['coalesced']
+        return {
+            **info,
+            'max_bytes': self.max_bytes,
+            'in_flight': in_flight,
+            'hit_ratio': round(totals['hits'] / lookups, 3) if lookups else None,
+            **totals,
+            'endpoints': per_endpoint,
+        }
@@ -0,0 +1,116 @@
+"""Binary columnar encoding for the dashboard's time-series responses.
+
+/api/overview and /api/per-user are mostly long lists: ISO timestamp strings
+(repeated for every series of a host) and rounded floats. encode() keeps the
+payload's structure but moves every long list into a typed little-endian
+buffer:
+
+    uint32   byte offset H of the header (then 4 bytes of padding)
+    ...      column buffers, each starting on an 8-byte boundary
+    H..end   UTF-8 JSON header: {"columns": [...], "data": <payload>}
+
+Inside "data" each moved list is replaced by {"$col": i}; columns[i] gives its
+type, byte offset, length and, for f32, the decimals to round back to:
+
+    ts   uint32 epoch seconds of naive 'YYYY-MM-DDTHH:MM:SS' strings; equal
+         timestamp lists (cpu/mem of one host) share one column
+    i32  int32
+    f32  float32 that rounds back to exactly the original value
+    f64  float64, for anything float32 can't carry
+
+frontend/src/columnar.js decodes it back into the same JSON shape.
+"""
+import json
+import re
+import struct
+
+import numpy as np
+
+COLUMNAR_MEDIA_TYPE = 'application/vnd.load-analyzer.columnar'
+
+# Shorter lists stay in the JSON header; a column costs a header entry + padding
+MIN_COLUMN_LENGTH = 16
+MAX_DECIMALS = 4
+
+_TIMESTAMP = re.compile(r'^\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d$')
+
+
+def _timestamps(values):
+    if not all(isinstance(v, str) and len(v) == 19 and _TIMESTAMP.match(v) for v in values):
+        return None
+    epoch = np.array(values, dtype='datetime64[s]').astype(np.int64)
+    if epoch.min() < 0 or epoch.max() > np.iinfo(np.uint32).max:
+        return None
+    return epoch.astype('<u4')
+
+
+def _numbers(values):
+    """Return (type, array, decimals) for a list of plain numbers, else None."""
+    if not all(type(v) in (int, float) for v in values):
+        return None
+    arr = np.asarray(values)
+    if arr.dtype.kind == 'i':
+        if arr.min() >= np.iinfo(np.int32).min and arr.max() <= np.iinfo(np.int32).max:
+            return 'i32', arr.astype('<i4'), None
+        return 'f64', arr.astype('<f8'), None
+    arr = arr.astype(np.float64)
+    if not np.isfinite(arr).all():
+        return None
+    widened = arr.astype(np.float32).astype(np.float64)
+    for decimals in range(MAX_DECIMALS + 1):
+        # same arithmetic as the decoder's Math.round(v * scale) / scale
+        scale = 10.0 ** decimals
+        if np.array_equal(np.floor(widened * scale + 0.5) / scale, arr):
+            return 'f32', arr.astype('<f4'), decimals
+    return 'f64', arr.astype('<f8'), None
+
+
+def encode(data) -> bytes:
+    """Encode a JSON-able payload (as built by the API handlers) to columnar bytes."""
+    columns, buffers = [], []
+    shared_timestamps = {}
+
+    def add_column(kind, arr, decimals=None):
+        column = {'type': kind, 'length': int(arr.size)}
+        if decimals is not None:
+            column['decimals'] = decimals
+        columns.append(column)
+        buffers.append((column, arr.tobytes()))
+        return {'$col': len(columns) - 1}
+
+    def walk(value):
+        if isinstance(value, dict):
+            if not any(isinstance(v, (dict, list)) for v in value.values()):
+                return value  # leaf record, e.g. one Slurm job
+            return {k: walk(v) for k, v in value.items()}
+        if not isinstance(value, list) or not value:
+            return value
+        if isinstance(value[0], str):
+            if len(value) >= MIN_COLUMN_LENGTH and _TIMESTAMP.match(value[0]):
+                epoch = _timestamps(value)
+                if epoch is not None:
+                    key = epoch.tobytes()
+                    if key not in shared_timestamps:
+                        shared_timestamps[key] = add_column('ts', epoch)
+                    return shared_timestamps[key]
+            return value  # plain strings (hover text, names) stay JSON
+        if len(value) >= MIN_COLUMN_LENGTH:
+            numbers = _numbers(value)
+            if numbers is not None:
+                return add_column(*numbers)
+        return [walk(v) for v in value]
+
+    payload = walk(data)
+
+    out = bytearray(8)  # header offset, padded so the first column is aligned
+    for column, raw in buffers:
+        column['offset'] = len(out)
+        out += raw
+        out += b'\0' * (_align(len(out)) - len(out))
+    struct.pack_into('<I', out, 0, len(out))
+    out += json.dumps({'columns': columns, 'data': payload}, default=str).encode()
+    return bytes(out)
+
+
+def _align(n, to=8):
+    return (n + to - 1) // to * to
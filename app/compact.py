@@ -0,0 +1,18 @@
+"""Process identities for compact raw storage (PROCESS_STORAGE = 'compact').
+
+A process's identity row (host, pid, start time, command line, ...) is keyed by
+an id derived from (host, pid, start_epoch), so monitor.py can insert new
+identities without a round trip for the id, and process_data_job.py's
+migration of the wide `processes` history derives the same ids.
+"""
+import hashlib
+
+# etimes is whole seconds and ps runs a moment after `date`, so the derived
+# start time of one process can wobble by a second between cycles.
+START_TOLERANCE_SECS = 2
+
+
+def identity_id(host: str, pid: int, start_epoch: int) -> int:
+    """Stable 63-bit id for a process, so new identities need no id round trip."""
+    digest = hashlib.blake2b(f"{host}:{pid}:{start_epoch}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') >> 1
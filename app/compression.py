@@ -0,0 +1,74 @@
+"""Pre-compressed response bodies for the API's cached payloads.
+
+The overview/per-user payloads are megabytes of mostly hover text, and the
+cache serves the same bytes many times per fill, so each body is compressed
+once when it is cached (compress_variants) and every hit just picks the
+variant the client accepts (PrecompressedResponse).
+"""
+import gzip
+
+from fastapi.responses import Response
+from starlette.datastructures import Headers
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+MIN_COMPRESS_BYTES = 1024   # below this the encoding overhead isn't worth it
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5          # ~gzip -9 ratio at a fraction of brotli's max-quality cost
+
+# Server preference when the client accepts several
+PREFERENCE = ('br', 'gzip')
+
+
+def compress_variants(body: bytes) -> dict:
+    """Return {'identity': body, 'gzip': ..., 'br': ...} (only identity for small bodies)."""
+    variants = {'identity': body}
+    if len(body) < MIN_COMPRESS_BYTES:
+        return variants
+    variants['gzip'] = gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    if brotli is not None:
+        variants['br'] = brotli.compress(body, quality=BROTLI_QUALITY)
+    return variants
+
+
+def choose_encoding(accept_encoding: str, available) -> str:
+    """Pick the preferred encoding in `available` that Accept-Encoding allows."""
+    accepted = {}
+    for part in accept_encoding.split(','):
+        name, _, params = part.strip().partition(';')
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    for encoding in PREFERENCE:
+        if encoding in available and accepted.get(encoding, accepted.get('*', 0.0)) > 0:
+            return encoding
+    return 'identity'
+
+
+class PrecompressedResponse(Response):
+    """Response that sends the variant of `variants` matching the request's Accept-Encoding.
+
+    The choice is made when the response is sent (the request headers are in
+    the ASGI scope), so handlers don't need to take Accept-Encoding themselves."""
+
+    def __init__(self, variants: dict, media_type: str, headers: dict = None):
+        self.variants = variants
+        headers = dict(headers or {})
+        headers['Vary'] = ', '.join(filter(None, [headers.get('Vary'), 'Accept-Encoding']))
+        super().__init__(content=variants['identity'], media_type=media_type, headers=headers)
+
+    async def __call__(self, scope, receive, send):
+        encoding = choose_encoding(Headers(scope=scope).get('accept-encoding', ''), self.variants)
+        if encoding != 'identity':
+            self.body = self.variants[encoding]
+            self.headers['content-encoding'] = encoding
+            self.headers['content-length'] = str(len(self.body))
+        await super().__call__(scope, receive, send)
@@ -1,3 +1,5 @@
+import os
+
 # Database configuration
 DB_CONFIG = {
     'host': '10.4.90.123',
@@ -6,3 +8,29 @@ DB_CONFIG = {
     'password': 'qhALiqwRFNlOzwqnbXgGbKpgCZXUiSZvmAsRLlFIIMqjSQrf',
     'port': 3312
 }
+
+# Raw process sample storage written by monitor.py:
+#   'wide'    - one full row per process per cycle in `processes`
+#   'compact' - identity (host, pid, start, args, ...) once in `process_identity`,
+#               per-cycle metrics only in `process_samples`
+# Readers query PROCESS_TABLE, which has the same columns either way
+# (`processes_compact` is a view joining the two compact tables). After
+# switching to 'compact', `process_data_job.py --migrate-to-compact` moves the
+# existing `processes` history into the compact tables.
+PROCESS_STORAGE = 'wide'
+PROCESS_TABLE = {'wide': 'processes', 'compact': 'processes_compact'}[PROCESS_STORAGE]
+
+# Tiered retention (retention_job.py): raw rows older than this many days are
+# exported to Parquet under ARCHIVE_DIR (app/archive.py) and then removed from
+# MySQL (`processes` a whole daily partition at a time, see app/partitions.py;
+# compact storage's process_samples a day at a time).
+# Readers of older ranges go to the archive. None keeps everything in MySQL.
+PROCESS_RETENTION_DAYS = None
+SLURM_NODE_ALLOC_RETENTION_DAYS = None
+ARCHIVE_DIR = os.environ.get('LOAD_ANALYZER_ARCHIVE_DIR', '/var/lib/load_analyzer/archive')
+
+# API response cache (api_server.py): byte budget across all cached responses
+CACHE_MAX_BYTES = 512 * 1024 * 1024
+# Redis server shared by all API workers (e.g. 'redis://localhost:6379/0');
+# unset = each worker keeps its own in-memory cache
+CACHE_REDIS_URL = os.environ.get('LOAD_ANALYZER_CACHE_REDIS_URL')
@@ -0,0 +1,31 @@
+"""Shape-preserving downsampling for the dashboard's time series.
+
+A chart can't show more points than it has pixels, so endpoints that take a
+`points` target thin every series to at most that many points. Averaging
+would flatten exactly the short spikes that capacity decisions hinge on, so
+instead each series is cut into equal runs and the lowest and highest point of
+every run are kept (a min/max envelope): every peak and trough survives, in
+time order, however long the date range.
+"""
+import numpy as np
+
+
+def envelope_indices(values, points: int, keep=()) -> np.ndarray:
+    """Sorted indices of the (at most `points`) points of `values` to keep:
+    the first, the last, and the min and max of each of (points - 2) // 2 runs.
+
+    Indices in `keep` (e.g. where a flag changes) are kept as well, out of the
+    same budget; if they alone don't fit, the union is thinned evenly."""
+    y = np.asarray(values, dtype=np.float64)
+    n = y.size
+    if n <= points:
+        return np.arange(n)
+    keep = np.unique(np.asarray(keep, dtype=np.int64))
+    runs = max((points - keep.size - 2) // 2, 1)
+    edges = np.linspace(0, n, runs + 1).astype(np.int64)
+    run = np.repeat(np.arange(runs), np.diff(edges))
+    order = np.lexsort((y, run))  # by run, then by value within it
+    idx = np.union1d(np.concatenate(([0, n - 1], order[edges[:-1]], order[edges[1:] - 1])), keep)
+    if idx.size > points:
+        idx = idx[np.linspace(0, idx.size - 1, points).astype(np.int64)]
+    return idx
@@ -0,0 +1,85 @@
+"""Daily layout of the raw `processes` table.
+
+`processes` gets millions of rows a day, so it is RANGE partitioned on
+snapshot_datetime with one partition per day (p20260318 holds rows before
+2026-03-19; the first partition also holds everything older) plus a `pmax`
+catch-all that process_data_job.py keeps empty by adding each day's partition
+ahead of time. Queries bounded on snapshot_datetime only open the partitions
+they need, and retention drops a whole day with DROP PARTITION instead of
+deleting its rows one by one.
+
+Its indexes are matched to the queries that read it:
+  idx_proc_time_cover     the aggregation scan (process_data_job.iter_raw_chunks
+                          and the backfill): every column it selects, in
+                          snapshot_datetime order, so it never reads the wide rows
+  idx_proc_host_pid_time  /api/process-history's (host, pid, time range) lookup
+
+The statements are plain SQL so monitor.py (mysql.connector) and
+process_data_job.py (SQLAlchemy) can both run them.
+"""
+from datetime import date, datetime, timedelta
+
+TABLE = 'processes'
+MAX_PARTITION = 'pmax'
+# Days of partitions kept created beyond today
+PARTITION_AHEAD_DAYS = 7
+
+PROCESS_INDEXES = {
+    'idx_proc_time_cover': '(snapshot_datetime, snapshot_time_epoch, host, pid, username, comm, cputimes, rss, pss)',
+    'idx_proc_host_pid_time': '(host, pid, snapshot_datetime)',
+}
+# Hand-added indexes (see MONITORING_NOTES.md) that no current query needs:
+# the covering index leads with snapshot_datetime, and per-user listings read
+# process_summary
+REPLACED_INDEXES = ('idx_snapshot_datetime', 'idx_proc_user_time')
+
+
+def partition_name(day: date) -> str:
+    return f"p{day:%Y%m%d}"
+
+
+def partition_day(name: str):
+    """The day a partition named by partition_name holds, or None for pmax."""
+    if name == MAX_PARTITION:
+        return None
+    return datetime.strptime(name[1:], '%Y%m%d').date()
+
+
+def _partition(day: date) -> str:
+    return f"PARTITION {partition_name(day)} VALUES LESS THAN ('{day + timedelta(days=1)}')"
+
+
+def _partitions(first: date, last: date) -> str:
+    """One partition per day from first to last, then pmax."""
+    parts = [_partition(first + timedelta(days=i)) for i in range((last - first).days + 1)]
+    parts.append(f"PARTITION {MAX_PARTITION} VALUES LESS THAN (MAXVALUE)")
+    return "(\n    " + ",\n    ".join(parts) + ")"
+
+
+def partitioning(first: date, last: date) -> str:
+    """PARTITION BY clause with daily partitions from first to last."""
+    return f"PARTITION BY RANGE COLUMNS(snapshot_datetime) {_partitions(first, last)}"
+
+
+def index_definitions() -> str:
+    return ",\n".join(f"INDEX {name} {cols}" for name, cols in PROCESS_INDEXES.items())
+
+
+def add_partitions_sql(first: date, last: date) -> str:
+    """Split the days first..last out of pmax."""
+    return f"ALTER TABLE {TABLE} REORGANIZE PARTITION {MAX_PARTITION} INTO {_partitions(first, last)}"
+
+
+def drop_partitions_sql(names) -> str:
+    return f"ALTER TABLE {TABLE} DROP PARTITION {', '.join(names)}"
+
+
+PARTITIONS_SQL = (
+    "SELECT partition_name FROM information_schema.partitions "
+    f"WHERE table_schema = DATABASE() AND table_name = '{TABLE}' "
+    "AND partition_name IS NOT NULL ORDER BY partition_ordinal_position"
+)
+INDEXES_SQL = (
+    "SELECT DISTINCT index_name FROM information_schema.statistics "
+    f"WHERE table_schema = DATABASE() AND table_name = '{TABLE}'"
+)
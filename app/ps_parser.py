@@ -0,0 +1,86 @@
+"""Incremental parser for the `ps` listing monitor.py collects from each host.
+
+monitor.py asks ps for every column behind an AIX-style `|%p ` prefix, so a
+line looks like
+
+    | 4242   4242 | 4242      1 | 4242 alice | 4242 python3 | ...
+
+i.e. each field is `|`, the pid, then the value. parse_ps() consumes lines as
+they come off the SSH stream, drops filtered processes before doing any
+per-field work, and yields compact PsRecord tuples.
+"""
+from typing import Iterable, Iterator, NamedTuple, Optional
+
+# pid, ppid, user, comm, cputimes, rss, vsz, thcount, etimes, bsdstart, args
+PS_FIELDS = 11
+
+
+class PsRecord(NamedTuple):
+    """One process; field order matches the processes table insert."""
+    pid: int
+    ppid: int
+    username: str
+    comm: str
+    cputimes: int
+    rss: int
+    pss: int
+    vsz: int
+    thcount: int
+    etimes: int
+    bdstart: str
+    args: str
+
+
+def _value(segment: str) -> str:
+    # Drop the %p prefix, collapse the rest (bsdstart is e.g. "Mar 23").
+    return ' '.join(segment.split()[1:])
+
+
+def parse_line(line: str) -> Optional[PsRecord]:
+    """Parse one ps line, or return None if it doesn't have the expected shape."""
+    # maxsplit keeps any '|' inside the command line in the args field
+    segs = line.split('|', PS_FIELDS)
+    if len(segs) != PS_FIELDS + 1:
+        return None
+    try:
+        return PsRecord(
+            pid=int(_value(segs[1])),
+            ppid=int(_value(segs[2])),
+            username=_value(segs[3]),
+            comm=_value(segs[4]),
+            cputimes=int(_value(segs[5])),
+            rss=int(_value(segs[6])),
+            pss=0,
+            vsz=int(_value(segs[7])),
+            thcount=int(_value(segs[8])),
+            etimes=int(_value(segs[9])),
+            bdstart=_value(segs[10]),
+            args=_value(segs[11]),
+        )
+    except ValueError:
+        return None
+
+
+def parse_ps(lines: Iterable[str], min_cputimes: int = 0,
+             exclude_users: frozenset = frozenset(),
+             exclude_processes: frozenset = frozenset()) -> Iterator[PsRecord]:
+    """Yield a PsRecord per ps line (header first) that passes the filters.
+
+    The user, comm and cputimes checks run on the raw segments, so the bulk of
+    a listing (system daemons, idle shells) never gets fully parsed."""
+    it = iter(lines)
+    next(it, None)  # header
+    for line in it:
+        segs = line.split('|', 6)
+        if len(segs) != 7:
+            continue
+        if _value(segs[3]) in exclude_users or _value(segs[4]) in exclude_processes:
+            continue
+        try:
+            if int(_value(segs[5])) < min_cputimes:
+                continue
+        except ValueError:
+            continue
+        rec = parse_line(line)
+        if rec is not None:
+            yield rec
@@ -0,0 +1,111 @@
+"""Persistent multiplexed SSH connections shared by the collectors.
+
+monitor.py, slurm_collector.py and slurm_capacity_collector.py used to start a
+fresh `ssh` (TCP connect + key exchange + auth) for every command. SSHPool keeps
+one OpenSSH ControlMaster per host instead: commands run as channels on the
+existing master, and ControlPersist keeps it alive between runs, so the cron
+collectors reuse the same master from one invocation to the next.
+"""
+import logging
+import os
+import subprocess
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+CONTROL_DIR = os.environ.get('LOAD_ANALYZER_SSH_CONTROL_DIR', '/tmp/load_analyzer_ssh')
+CONTROL_PERSIST = 900        # seconds an idle master stays up (> the 5-min monitor cycle)
+HEALTH_CHECK_INTERVAL = 60   # seconds between `ssh -O check` probes of a master
+SSH_ERROR = 255              # ssh's own exit status for connection-level failures
+
+
+class SSHPool:
+    """Run commands on remote hosts over per-host multiplexed SSH masters.
+
+    Thread-safe: monitor.py calls it from its collection pool. A master that
+    fails its health check, or a command that dies with ssh's connection error
+    status, tears the master down so the next command reconnects.
+    """
+
+    def __init__(self, user, key, options=(), control_dir=CONTROL_DIR,
+                 persist=CONTROL_PERSIST):
+        self.user = user
+        self.key = key
+        self.options = list(options)
+        self.control_dir = control_dir
+        self.persist = persist
+        self._checked = {}   # host -> time.time() of the last good health check
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        os.makedirs(control_dir, mode=0o700, exist_ok=True)
+
+    def _lock(self, host):
+        with self._locks_guard:
+            return self._locks.setdefault(host, threading.Lock())
+
+    def _ssh_args(self, host):
+        return ['ssh', '-i', self.key, *self.options,
+                '-o', 'ControlMaster=auto',
+                '-o', f'ControlPath={self.control_dir}/%C',
+                '-o', f'ControlPersist={self.persist}',
+                f'{self.user}@{host}']
+
+    def _control(self, host, op):
+        """Send a control command (`check` / `exit`) to the host's master."""
+        args = self._ssh_args(host)
+        try:
+            r = subprocess.run(args[:-1] + ['-O', op, args[-1]],
+                               capture_output=True, timeout=10)
+        except subprocess.TimeoutExpired:
+            return False
+        return r.returncode == 0
+
+    def reset(self, host):
+        """Drop the host's master (if any); the next command opens a new one."""
+        with self._lock(host):
+            self._checked.pop(host, None)
+            if self._control(host, 'exit'):
+                logger.info(f"Closed SSH master for {host}")
+
+    def ensure(self, host):
+        """Health-check the host's master at most every HEALTH_CHECK_INTERVAL.
+
+        A master that doesn't answer is torn down; ControlMaster=auto then
+        starts a new one with the next command."""
+        with self._lock(host):
+            last = self._checked.get(host)
+            if last is not None and time.time() - last < HEALTH_CHECK_INTERVAL:
+                return
+            if self._control(host, 'check'):
+                self._checked[host] = time.time()
+                return
+            if last is not None:
+                logger.warning(f"SSH master for {host} failed its health check, reconnecting")
+            self._control(host, 'exit')
+            self._checked.pop(host, None)
+
+    def popen(self, host, command, **kwargs):
+        """Start `command` on `host` and return the Popen (stdout/stderr piped)."""
+        self.ensure(host)
+        kwargs.setdefault('stdout', subprocess.PIPE)
+        kwargs.setdefault('stderr', subprocess.PIPE)
+        return subprocess.Popen(self._ssh_args(host) + [command], **kwargs)
+
+    def run(self, host, command, timeout=60, text=True):
+        """Run `command` on `host` and return the CompletedProcess.
+
+        A connection-level failure is retried once on a fresh master; a timeout
+        resets the master (it may be wedged) and re-raises."""
+        for attempt in (1, 2):
+            self.ensure(host)
+            try:
+                r = subprocess.run(self._ssh_args(host) + [command],
+                                   capture_output=True, text=text, timeout=timeout)
+            except subprocess.TimeoutExpired:
+                self.reset(host)
+                raise
+            if r.returncode != SSH_ERROR or attempt == 2:
+                return r
+            logger.warning(f"SSH to {host} failed ({r.stderr.strip()!r}), retrying on a new master")
+            self.reset(host)
@@ -1,30 +1,141 @@
-import time, pandas as pd
-from datetime import datetime, timedelta
-from sqlalchemy import create_engine, text
-from app.config import DB_CONFIG
+#!/usr/bin/env python3
+"""Rebuild load_summary from raw process snapshots for a range of days.
 
-engine = create_engine('mysql+pymysql://%s:%s@%s:%s/%s' % (DB_CONFIG['user'],DB_CONFIG['password'],DB_CONFIG['host'],DB_CONFIG['port'],DB_CONFIG['database']))
+Days run in parallel across a process pool, each through the production
+aggregation (process_data_job.rebuild_range), and finished days are recorded in
+a checkpoint file so an interrupted run picks up where it left off:
 
-for day_offset in range(14, 0, -1):
-    day_start = (datetime.now() - timedelta(days=day_offset)).strftime('%Y-%m-%d 00:00:00')
-    day_end = (datetime.now() - timedelta(days=day_offset-1)).strftime('%Y-%m-%d 00:00:00')
+    python backfill.py --start 2025-10-01 --end 2026-03-31 --workers 4
+
+--rollups-only leaves load_summary alone and just (re)builds the 30m/2h/1d
+rollup tables from it, e.g. to populate them for history that predates them.
+
+The incremental job (process_data_job.py) rewrites buckets from its late-row
+lookback before the watermark on, so a load_summary backfill is clamped to
+end the day before that (--rollups-only only re-derives rollups from
+load_summary, which is safe up to today). A day that fails is reported, left
+out of the checkpoint (a rerun retries it) and makes the exit status 1.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+
+from process_data_job import (DATETIME_SLACK, LATE_LOOKBACK_SECS, get_engine, read_watermark, rebuild_range,
+                              rebuild_rollups)
+
+DEFAULT_CHECKPOINT = '/tmp/load_analyzer_backfill.json'
+ROLLUPS_CHECKPOINT = '/tmp/load_analyzer_backfill_rollups.json'
+
+_engine = None
+
+
+def backfill_day(day, rollups_only=False):
+    """Worker: rebuild one day. Each worker process keeps its own engine."""
+    global _engine
+    if _engine is None:
+        _engine = get_engine()
+    start = datetime.combine(day, datetime.min.time())
+    end = start + timedelta(days=1)
     t0 = time.time()
-    df = pd.read_sql(text("SELECT * FROM processes WHERE snapshot_datetime BETWEEN :s AND :e"), con=engine, params={'s': day_start, 'e': day_end})
-    if df.empty:
-        print('Day -%d: no data' % day_offset)
-        continue
-    df = df.sort_values(by='snapshot_datetime', ascending=True)
-    df['rss'] = (df['rss'] / 1000000).round(4)
-    df['cpu_diff'] = (df['cputimes'] - df.groupby(['host', 'pid'])['cputimes'].shift()).fillna(0)
-    df['seconds_diff'] = (df['snapshot_time_epoch'] - df.groupby(['host', 'pid'])['snapshot_time_epoch'].shift()).fillna(0)
-    df['cpu_norm'] = (df['cpu_diff'].div(df['seconds_diff'])).fillna(0).replace([float('inf'), float('-inf')], 0)
-    df = df[(df['cpu_norm'] > 0) & (df['cpu_norm'] < 10000)]
-    summary = df.groupby([pd.Grouper(key='snapshot_datetime', freq='5min'), 'host', 'username', 'comm']).agg(cpu_norm=('cpu_norm', 'sum'), rss=('rss', 'sum')).reset_index()
-    summary = summary[(summary['cpu_norm'] > 0) | (summary['rss'] > 0)]
-    summary['cpu_norm'] = summary['cpu_norm'].round(4)
-    summary['rss'] = summary['rss'].round(4)
-    with engine.begin() as conn:
-        conn.execute(text("DELETE FROM load_summary WHERE snapshot_datetime BETWEEN :s AND :e"), {'s': day_start, 'e': day_end})
-    summary[['snapshot_datetime', 'host', 'username', 'comm', 'cpu_norm', 'rss']].to_sql('load_summary', engine, if_exists='append', index=False, method='multi', chunksize=500)
+    if rollups_only:
+        rebuild_rollups(_engine, start, end)
+        return day, 0, 0, time.time() - t0
+    raw_rows, summary_rows = rebuild_range(_engine, start, end)
+    return day, raw_rows, summary_rows, time.time() - t0
+
+
+def load_checkpoint(path):
+    if not os.path.exists(path):
+        return set()
+    with open(path) as f:
+        return set(json.load(f).get('done', []))
+
+
+def save_checkpoint(path, done):
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump({'done': sorted(done)}, f)
+    os.replace(tmp, path)
+
+
+def main():
+    yesterday = date.today() - timedelta(days=1)
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--start', type=date.fromisoformat,
+                        default=yesterday - timedelta(days=13), help='first day (YYYY-MM-DD)')
+    parser.add_argument('--end', type=date.fromisoformat,
+                        default=yesterday, help='last day, inclusive (YYYY-MM-DD)')
+    parser.add_argument('--workers', type=int, default=4, help='days processed concurrently')
+    parser.add_argument('--checkpoint',
+                        help='file recording finished days (default: %s, or %s with --rollups-only)'
+                             % (DEFAULT_CHECKPOINT, ROLLUPS_CHECKPOINT))
+    parser.add_argument('--rollups-only', action='store_true',
+                        help='only rebuild the rollup tables from existing load_summary rows')
+    parser.add_argument('--fresh', action='store_true', help='ignore the checkpoint and redo every day')
+    args = parser.parse_args()
+    if args.checkpoint is None:
+        args.checkpoint = ROLLUPS_CHECKPOINT if args.rollups_only else DEFAULT_CHECKPOINT
+
+    watermark = None if args.rollups_only else read_watermark(get_engine())
+    if watermark is not None:
+        # refold_late_rows rebuilds buckets back to LATE_LOOKBACK_SECS (read
+        # with DATETIME_SLACK) before the watermark; stop at the day before that
+        owned_from = pd.Timestamp(watermark[1]) - timedelta(seconds=LATE_LOOKBACK_SECS) - DATETIME_SLACK
+        last_day = owned_from.date() - timedelta(days=1)
+        if args.start > last_day:
+            sys.exit('%s..%s overlaps the incremental job (from %s); nothing to backfill' % (
+                args.start, args.end, owned_from))
+        if args.end > last_day:
+            print('Clamping --end %s to %s: later days are the incremental job\'s (from %s)' % (
+                args.end, last_day, owned_from))
+            args.end = last_day
+
+    done = set() if args.fresh else load_checkpoint(args.checkpoint)
+    days = []
+    day = args.start
+    while day <= args.end:
+        if day.isoformat() not in done:
+            days.append(day)
+        day += timedelta(days=1)
+    print('%d day(s) to backfill (%d already done), %d worker(s)' % (
+        len(days), (args.end - args.start).days + 1 - len(days), args.workers))
+
+    t0 = time.time()
+    total_raw = 0
+    failed = []
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = {pool.submit(backfill_day, d, args.rollups_only): d for d in days}
+        for future in as_completed(futures):
+            try:
+                day, raw_rows, summary_rows, elapsed = future.result()
+            except Exception as e:
+                failed.append(futures[future])
+                print('%s: failed: %r' % (futures[future], e), file=sys.stderr)
+                continue
+            total_raw += raw_rows
+            if args.rollups_only:
+                print('%s: rollups rebuilt (%.1fs)' % (day, elapsed))
+            elif raw_rows:
+                print('%s: %d raw -> %d summary rows (%.1fs, %.0f rows/s)' % (
+                    day, raw_rows, summary_rows, elapsed, raw_rows / max(elapsed, 1e-6)))
+            else:
+                print('%s: no data' % day)
+            done.add(day.isoformat())
+            save_checkpoint(args.checkpoint, done)
+
     elapsed = time.time() - t0
-    print('Day -%d: %d raw -> %d summary rows (%.1fs)' % (day_offset, len(df), len(summary), elapsed))
+    print('Done: %d raw rows in %.1fs (%.0f rows/s overall)' % (
+        total_raw, elapsed, total_raw / max(elapsed, 1e-6)))
+    if failed:
+        sys.exit('%d day(s) failed, rerun to retry: %s' % (
+            len(failed), ', '.join(d.isoformat() for d in sorted(failed))))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,11 @@
 #!/bin/bash
 set -e
 
-# Create cron job to run process_data_job.py every 5 minutes
-echo "*/5 * * * * cd /app && /usr/local/bin/python3 /app/process_data_job.py >> /var/log/cron.log 2>&1" > /etc/cron.d/process-data-cron
+# Create cron job to run process_data_job.py every 5 minutes, then rebuild the
+# dashboard's default-window payloads from the fresh data
+echo "*/5 * * * * cd /app && /usr/local/bin/python3 /app/process_data_job.py >> /var/log/cron.log 2>&1 && /usr/local/bin/python3 /app/refresh_hot_windows.py >> /var/log/cron.log 2>&1" > /etc/cron.d/process-data-cron
+# Once a day, move raw rows past their retention into the Parquet archive
+echo "30 3 * * * cd /app && /usr/local/bin/python3 /app/retention_job.py >> /var/log/cron.log 2>&1" >> /etc/cron.d/process-data-cron
 chmod 0644 /etc/cron.d/process-data-cron
 crontab /etc/cron.d/process-data-cron
 
@@ -13,8 +16,9 @@ chmod 666 /var/log/cron.log
 # Start cron service
 service cron start
 
-# Start React+FastAPI dashboard on port 80
-python3 -m uvicorn api_server:app --host 0.0.0.0 --port 80 &
+# Start React+FastAPI dashboard on port 80. Extra workers only pay off with a
+# shared cache (LOAD_ANALYZER_CACHE_REDIS_URL), otherwise each computes its own.
+python3 -m uvicorn api_server:app --host 0.0.0.0 --port 80 --workers "${API_WORKERS:-1}" &
 
 # Keep container running and monitor logs
 tail -f /var/log/cron.log
@@ -0,0 +1,46 @@
+// Decoder for the API's binary columnar responses (app/columnar.py has the
+// format). useServerData asks for it via Accept and gets back the same object
+// the JSON response would have produced.
+export const COLUMNAR_MEDIA_TYPE = 'application/vnd.load-analyzer.columnar';
+
+const pad2 = (n) => String(n).padStart(2, '0');
+
+// Naive 'YYYY-MM-DDTHH:MM:SS', exactly as the JSON responses format timestamps
+function formatTimestamp(seconds) {
+  const d = new Date(seconds * 1000);
+  return `${d.getUTCFullYear()}-${pad2(d.getUTCMonth() + 1)}-${pad2(d.getUTCDate())}`
+    + `T${pad2(d.getUTCHours())}:${pad2(d.getUTCMinutes())}:${pad2(d.getUTCSeconds())}`;
+}
+
+function decodeColumn(buffer, { type, offset, length, decimals }) {
+  switch (type) {
+    case 'ts':
+      return Array.from(new Uint32Array(buffer, offset, length), formatTimestamp);
+    case 'i32':
+      return Array.from(new Int32Array(buffer, offset, length));
+    case 'f32': {
+      const scale = 10 ** decimals;
+      return Array.from(new Float32Array(buffer, offset, length), (v) => Math.round(v * scale) / scale);
+    }
+    case 'f64':
+      return Array.from(new Float64Array(buffer, offset, length));
+    default:
+      throw new Error(`Unknown column type ${type}`);
+  }
+}
+
+export function decodeColumnar(buffer) {
+  const headerOffset = new DataView(buffer).getUint32(0, true);
+  const header = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, headerOffset)));
+  const columns = header.columns.map((column) => decodeColumn(buffer, column));
+
+  const revive = (value) => {
+    if (Array.isArray(value)) return value.map(revive);
+    if (value && typeof value === 'object') {
+      if ('$col' in value) return columns[value.$col];
+      return Object.fromEntries(Object.entries(value).map(([k, v]) => [k, revive(v)]));
+    }
+    return value;
+  };
+  return revive(header.data);
+}
@@ -117,10 +117,11 @@ function ServerBreakdown({ servers }) {
 export default function AnalyticsTab() {
   const fmt = (d) => d.toISOString().split('T')[0];
   const today = new Date();
-  const oneMonthAgo = new Date(today);
-  oneMonthAgo.setMonth(oneMonthAgo.getMonth() - 1);
+  // 30 days, one of the windows refresh_hot_windows.py pre-builds
+  const thirtyDaysAgo = new Date(today);
+  thirtyDaysAgo.setDate(thirtyDaysAgo.getDate() - 30);
 
-  const [startDate, setStartDate] = useState(fmt(oneMonthAgo));
+  const [startDate, setStartDate] = useState(fmt(thirtyDaysAgo));
   const [endDate, setEndDate] = useState(fmt(today));
   const [dataStart, setDataStart] = useState(null);
   const { data, loading, error } = useServerData('analytics', startDate, endDate);
@@ -1,5 +1,7 @@
 import { useState } from 'react';
 import { useServerData } from '../hooks/useServerData';
+import { OVERVIEW_INCREMENTAL } from '../overviewDelta';
+import { CHART_POINTS } from '../config';
 import ServerChart from './ServerChart';
 
 const SERVER_COLORS = {
@@ -11,7 +13,10 @@ const SERVER_COLORS = {
 };
 
 export default function OverviewTab({ startDate, endDate }) {
-  const { data, loading, error } = useServerData('overview', startDate, endDate);
+  const { data, loading, error } = useServerData('overview', startDate, endDate, {
+    incremental: OVERVIEW_INCREMENTAL,
+    points: CHART_POINTS,
+  });
   // Per-host axis mode: absolute (default, axes fixed to machine spec) vs
   // proportional (autoscale, so brief spikes above capacity stay visible).
   const [proportional, setProportional] = useState({});
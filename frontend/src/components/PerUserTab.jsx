@@ -1,9 +1,10 @@
 import { useServerData } from '../hooks/useServerData';
+import { CHART_POINTS } from '../config';
 import UserStackedChart from './UserStackedChart';
 import TopConsumersTable from './TopConsumersTable';
 
 export default function PerUserTab({ startDate, endDate }) {
-  const { data, loading, error } = useServerData('per-user', startDate, endDate);
+  const { data, loading, error } = useServerData('per-user', startDate, endDate, { points: CHART_POINTS });
 
   if (loading && !data) return <div style={{ padding: '40px', textAlign: 'center' }}>Loading...</div>;
   if (error) return <div style={{ padding: '20px', color: 'red' }}>Error: {error}</div>;
@@ -9,3 +9,8 @@ export const USER_COLORS = [
 ];
 
 export const REFRESH_INTERVAL_MS = 120000;
+// Incremental pollers (see useServerData) re-fetch everything this often anyway
+export const FULL_REFRESH_INTERVAL_MS = 30 * 60 * 1000;
+// Points per series requested for the time-series charts: about one per pixel
+// of a full-width chart, whatever the date range
+export const CHART_POINTS = 1500;
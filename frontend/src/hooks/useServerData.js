@@ -1,14 +1,23 @@
 import { useState, useEffect, useCallback, useRef } from 'react';
-import { REFRESH_INTERVAL_MS } from '../config';
+import { FULL_REFRESH_INTERVAL_MS, REFRESH_INTERVAL_MS } from '../config';
+import { COLUMNAR_MEDIA_TYPE, decodeColumnar } from '../columnar';
 
-export function useServerData(endpoint, startDate, endDate) {
+// Options:
+//   incremental  { since, merge } (e.g. OVERVIEW_INCREMENTAL): polls fetch only
+//                what is newer than since(data) and merge it in; a full fetch
+//                still happens whenever the params change and every
+//                FULL_REFRESH_INTERVAL_MS
+//   points       ask the server to thin every series to this many points
+export function useServerData(endpoint, startDate, endDate, { incremental = null, points = null } = {}) {
   const [data, setData] = useState(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
   const abortRef = useRef(null);
   const debounceRef = useRef(null);
+  const dataRef = useRef(null);
+  const lastFullRef = useRef(0);
 
-  const fetchData = useCallback(async () => {
+  const fetchData = useCallback(async (poll = false) => {
     if (abortRef.current) abortRef.current.abort();
     const controller = new AbortController();
     abortRef.current = controller;
@@ -18,11 +27,27 @@ export function useServerData(endpoint, startDate, endDate) {
       const params = new URLSearchParams();
       if (startDate) params.set('start', startDate);
       if (endDate) params.set('end', endDate);
+      if (points) params.set('points', points);
+      const prev = dataRef.current;
+      const since = poll && incremental && prev && Date.now() - lastFullRef.current < FULL_REFRESH_INTERVAL_MS
+        ? incremental.since(prev) : null;
+      if (since) params.set('since', since);
       const url = `/api/${endpoint}?${params}`;
-      const res = await fetch(url, { signal: controller.signal });
+      // Time-series endpoints answer in the compact columnar format; the rest
+      // fall back to JSON, so check what actually came back.
+      const res = await fetch(url, {
+        signal: controller.signal,
+        headers: { Accept: `${COLUMNAR_MEDIA_TYPE}, application/json` },
+      });
       if (!res.ok) throw new Error(`HTTP ${res.status}`);
-      const json = await res.json();
-      setData(json);
+      const contentType = res.headers.get('content-type') || '';
+      const json = contentType.startsWith(COLUMNAR_MEDIA_TYPE)
+        ? decodeColumnar(await res.arrayBuffer())
+        : await res.json();
+      const next = since ? incremental.merge(prev, json) : json;
+      if (!since) lastFullRef.current = Date.now();
+      dataRef.current = next;
+      setData(next);
       setError(null);
     } catch (err) {
       if (err.name !== 'AbortError') {
@@ -31,7 +56,7 @@ export function useServerData(endpoint, startDate, endDate) {
     } finally {
       setLoading(false);
     }
-  }, [endpoint, startDate, endDate]);
+  }, [endpoint, startDate, endDate, incremental, points]);
 
   // Track previous params to detect real changes vs polling
   const prevParamsRef = useRef({ endpoint, startDate, endDate });
@@ -53,7 +78,7 @@ export function useServerData(endpoint, startDate, endDate) {
     }, paramsChanged ? 500 : 0);
 
     // Set up polling after initial debounced fetch
-    const interval = setInterval(fetchData, REFRESH_INTERVAL_MS);
+    const interval = setInterval(() => fetchData(true), REFRESH_INTERVAL_MS);
     return () => {
       clearTimeout(debounceRef.current);
       clearInterval(interval);
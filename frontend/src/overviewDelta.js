@@ -0,0 +1,52 @@
+// Incremental polling for /api/overview: instead of re-downloading the whole
+// window, useServerData asks for the points at or after the newest timestamp it
+// has (?since=) and splices them in (api_server._overview_since describes the
+// response).
+const SERIES = ['cpu', 'mem', 'gpu', 'slurm'];
+// Series lists that are sent whole rather than per timestamp
+const WHOLE_KEYS = new Set(['reboots']);
+
+// Newest timestamp in any series, or null if there is nothing to extend
+function since(data) {
+  let newest = null;
+  for (const server of data.servers) {
+    for (const name of SERIES) {
+      const ts = server[name]?.timestamps;
+      const last = ts && ts[ts.length - 1];
+      if (last && (newest === null || last > newest)) newest = last;
+    }
+  }
+  return newest;
+}
+
+// old's points before fresh's first timestamp, followed by all of fresh's
+function spliceSeries(old, fresh) {
+  if (!fresh) return old;
+  if (!old) return fresh;
+  const first = fresh.timestamps[0];
+  let cut = old.timestamps.length;
+  while (cut > 0 && old.timestamps[cut - 1] >= first) cut--;
+  const spliced = { ...fresh };
+  for (const [key, value] of Object.entries(old)) {
+    if (Array.isArray(value) && !WHOLE_KEYS.has(key)) {
+      spliced[key] = value.slice(0, cut).concat(fresh[key]);
+    }
+  }
+  return spliced;
+}
+
+function merge(data, delta) {
+  const byHost = new Map(delta.servers.map((s) => [s.hostname, s]));
+  return {
+    ...data,
+    servers: data.servers.map((server) => {
+      const fresh = byHost.get(server.hostname);
+      if (!fresh) return server;
+      const merged = { ...server };
+      for (const name of SERIES) merged[name] = spliceSeries(server[name], fresh[name]);
+      return merged;
+    }),
+  };
+}
+
+export const OVERVIEW_INCREMENTAL = { since, merge };
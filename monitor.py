@@ -1,51 +1,29 @@
 #!/usr/bin/env python3
 import json
+import secrets
+import shlex
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, timedelta
 import mysql.connector
-import subprocess
 import signal
 import sys
+import tempfile
+import threading
 import time
 import os
 
+from app.compact import START_TOLERANCE_SECS, identity_id
+from app.config import PROCESS_STORAGE
+from app.partitions import PARTITION_AHEAD_DAYS, index_definitions, partitioning
+from app.ps_parser import parse_ps
+from app.ssh_pool import SSHPool, SSH_ERROR
+
 
 SSH_KEY = "/app/monitor_key"
 SSH_USER = "loadmon"
 HOSTS_CONFIG = "/app/monitor_hosts.json"
 
 
-def ssh_with_timeout(cmd, timeout_secs=30):
-    """Run SSH command using shell timeout and temp files to avoid pipe hangs."""
-    import tempfile
-    import shlex
-    stdout_file = tempfile.NamedTemporaryFile(mode='w+', suffix='.out', delete=False)
-    stderr_file = tempfile.NamedTemporaryFile(mode='w+', suffix='.err', delete=False)
-    stdout_path = stdout_file.name
-    stderr_path = stderr_file.name
-    stdout_file.close()
-    stderr_file.close()
-    try:
-        shell_cmd = f"timeout -k 5 {timeout_secs} " + " ".join(shlex.quote(c) for c in cmd) + f" > {stdout_path} 2> {stderr_path}"
-        print(f"  Running: {shell_cmd[:120]}...", flush=True)
-        rc = os.system(shell_cmd)
-        print(f"  os.system returned: {rc}", flush=True)
-        rc = rc >> 8  # get actual exit code
-        with open(stdout_path) as f:
-            stdout = f.read()
-        with open(stderr_path) as f:
-            stderr = f.read()
-        if rc == 124:  # timeout exit code
-            return None, f"Timed out after {timeout_secs}s", -1
-        return stdout, stderr, rc
-    finally:
-        try:
-            os.unlink(stdout_path)
-        except OSError:
-            pass
-        try:
-            os.unlink(stderr_path)
-        except OSError:
-            pass
-
 class DbUtils:
     def __init__(self, user, password, port, host, database):
         self.conn = mysql.connector.connect(
@@ -65,6 +43,32 @@ class DbUtils:
         cur.execute(query, params)
         cur.close()
 
+    def insert_many(self, query, rows, batch_size):
+        """Insert `rows` with executemany, `batch_size` rows per statement, in
+        one transaction. Returns the per-batch timings in seconds."""
+        timings = []
+        cur = self.conn.cursor()
+        self.conn.start_transaction()
+        try:
+            for i in range(0, len(rows), batch_size):
+                t0 = time.time()
+                cur.executemany(query, rows[i:i + batch_size])
+                timings.append(time.time() - t0)
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        finally:
+            cur.close()
+        return timings
+
+    def query(self, query, params=None):
+        cur = self.conn.cursor()
+        cur.execute(query, params)
+        rows = cur.fetchall()
+        cur.close()
+        return rows
+
     def commit(self):
         self.conn.commit()
 
@@ -85,9 +89,12 @@ HOSTS = _hosts_cfg['hosts']
 GPU_HOSTS = _hosts_cfg.get('gpu_hosts', [])
 print(f"Loaded {len(HOSTS)} hosts, {len(GPU_HOSTS)} GPU hosts from {HOSTS_CONFIG}", flush=True)
 
-SSH_OPTS = ["-i", SSH_KEY, "-o", "StrictHostKeyChecking=accept-new",
+SSH_OPTS = ["-o", "StrictHostKeyChecking=accept-new",
             "-o", "ConnectTimeout=10", "-o", "ServerAliveInterval=5",
             "-o", "ServerAliveCountMax=3"]
+# One multiplexed master per host, kept across cycles (ControlPersist outlives
+# the 5-min sleep), so each cycle's command is a channel open, not a handshake.
+SSH_POOL = SSHPool(SSH_USER, SSH_KEY, SSH_OPTS)
 
 ps_arg_tuples = [
     ('pid', 'process ID'),
@@ -111,6 +118,14 @@ for arg_tuple in ps_arg_tuples:
 
 COMMAND = f"ps  -e {ps_args}"
 
+# Processes below this many CPU seconds are skipped (and get no PSS read).
+MIN_CPUTIMES = 10
+
+# Shell script run as the single SSH command per host; see its header for the
+# framing protocol.
+with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'monitor_agent.sh')) as f:
+    AGENT_SCRIPT = f.read()
+
 exclude_processes = ['bash', 'sshd', '(sd-pam)', 'screen', 'systemd']
 
 exclude_users = [
@@ -171,7 +186,14 @@ exclude_users = [
     'loadmon',
 ]
 
-sql = """create table if not exists processes (
+EXCLUDE_USERS = frozenset(exclude_users)
+EXCLUDE_PROCESSES = frozenset(exclude_processes)
+
+# Daily partitions and query-matched indexes (app/partitions.py); an existing
+# unpartitioned table is migrated with `process_data_job.py --partition-processes`
+# and process_data_job.py adds partitions from then on. Only wide storage
+# writes it.
+sql = f"""create table if not exists processes (
 
         pid int,
         ppid int,
@@ -187,16 +209,61 @@ sql = """create table if not exists processes (
         args TEXT not null,
         snapshot_time_epoch int not null,
         snapshot_datetime datetime not null,
-        host varchar(20))
+        host varchar(20),
+        {index_definitions()})
+        {partitioning(date.today(), date.today() + timedelta(days=PARTITION_AHEAD_DAYS))}
 """
-db.execute(sql)
+if PROCESS_STORAGE == 'wide':
+    db.execute(sql)
 
-# Add pss column if it doesn't exist (for existing tables)
-try:
-    db.execute("ALTER TABLE processes ADD COLUMN pss int NOT NULL DEFAULT 0 AFTER rss")
-    print("Added pss column to processes")
-except Exception:
-    pass  # Column already exists
+    # Add pss column if it doesn't exist (for existing tables)
+    try:
+        db.execute("ALTER TABLE processes ADD COLUMN pss int NOT NULL DEFAULT 0 AFTER rss")
+        print("Added pss column to processes")
+    except Exception:
+        pass  # Column already exists
+
+# Compact storage (PROCESS_STORAGE = 'compact'): a long-running process's
+# identity and full command line are written once, and each cycle only adds
+# its changing metrics. processes_compact joins them back into the same
+# columns as `processes` for the readers. Switching an existing deployment:
+# set PROCESS_STORAGE, restart this, then move the wide history over with
+# `process_data_job.py --migrate-to-compact`.
+identity_sql = """create table if not exists process_identity (
+        id bigint not null primary key,
+        host varchar(20) not null,
+        pid int not null,
+        start_epoch int not null,
+        ppid int,
+        username varchar(50) not null,
+        comm varchar(100) not null,
+        bdstart varchar(100),
+        args TEXT not null,
+        INDEX idx_pi_host_pid (host, pid))
+"""
+samples_sql = """create table if not exists process_samples (
+        identity_id bigint not null,
+        cputimes int not null,
+        rss int not null,
+        pss int not null default 0,
+        vsz bigint not null,
+        thcount int not null,
+        etimes int not null,
+        snapshot_time_epoch int not null,
+        snapshot_datetime datetime not null,
+        INDEX idx_samples_time (snapshot_datetime),
+        INDEX idx_samples_identity_time (identity_id, snapshot_datetime))
+"""
+compact_view_sql = """create or replace algorithm=merge view processes_compact as
+        select i.pid, i.ppid, i.username, i.comm, s.cputimes, s.rss, s.pss, s.vsz,
+               s.thcount, s.etimes, i.bdstart, i.args, s.snapshot_time_epoch,
+               s.snapshot_datetime, i.host
+        from process_samples s join process_identity i on i.id = s.identity_id
+"""
+if PROCESS_STORAGE == 'compact':
+    db.execute(identity_sql)
+    db.execute(samples_sql)
+    db.execute(compact_view_sql)
 
 gpu_sql = """create table if not exists gpu_stats (
         host varchar(20) not null,
@@ -220,184 +287,333 @@ try:
 except Exception:
     pass  # Column already exists
 
+
+class TruncatedFrame(Exception):
+    """An agent section ended early (dropped connection or deadline kill)."""
+
+
+def stream_ssh(host, command, deadline):
+    """Run `command` on `host` over SSH, yielding stdout lines as they arrive.
+
+    `deadline` is an absolute time.time() value shared by the whole collection
+    cycle; an ssh that is still running when it passes is killed so one dead
+    node can't hold up the rest of the cycle. stderr goes to a temp file so a
+    chatty remote can't fill a pipe and stall the stream."""
+    with tempfile.TemporaryFile() as errf:
+        ssh = SSH_POOL.popen(host, command, stderr=errf)
+        timed_out = threading.Event()
+
+        def on_deadline():
+            timed_out.set()
+            ssh.kill()
+
+        timer = threading.Timer(max(1, deadline - time.time()), on_deadline)
+        timer.start()
+        try:
+            for line in ssh.stdout:
+                yield line.decode("utf-8", errors="replace").rstrip('\n')
+        finally:
+            timer.cancel()
+            if ssh.poll() is None:
+                ssh.kill()
+            ssh.stdout.close()
+            ssh.wait()  # reap child process to prevent zombies
+        if timed_out.is_set():
+            SSH_POOL.reset(host)  # the master may be wedged; reconnect next cycle
+            raise TimeoutError(f"ssh to {host} passed the cycle deadline")
+        if ssh.returncode == SSH_ERROR:
+            SSH_POOL.reset(host)
+            errf.seek(0)
+            sys.stderr.write(f"error on {host}: {errf.read().decode(errors='replace')}\n")
+
+
+def agent_command(mark, want_ps, want_gpu):
+    return (f"LA_MARK={mark} LA_PS={int(want_ps)} LA_GPU={int(want_gpu)} "
+            f"LA_MIN_CPU={MIN_CPUTIMES} LA_PS_CMD={shlex.quote(COMMAND)} "
+            f"LA_EXCLUDE_USERS={shlex.quote('|'.join(sorted(EXCLUDE_USERS)))} "
+            f"LA_EXCLUDE_PROCESSES={shlex.quote('|'.join(sorted(EXCLUDE_PROCESSES)))}\n"
+            f"{AGENT_SCRIPT}")
+
+
+def iter_frames(lines, mark):
+    """Yield (section, body) for each frame in the agent output as it streams.
+
+    `body` iterates over exactly the frame's lines and raises TruncatedFrame
+    if the stream ends early or the END marker doesn't follow, so consumers
+    can parse while reading but must only act on a body they exhausted. It
+    has to be consumed before asking for the next frame. Lines outside a
+    BEGIN/END pair (login-script noise) are skipped."""
+    it = iter(lines)
+
+    def body(name, count):
+        for _ in range(count):
+            line = next(it, None)
+            if line is None:
+                raise TruncatedFrame(name)
+            yield line
+        if next(it, '').split() != [mark, 'END', name]:
+            raise TruncatedFrame(name)
+
+    for line in it:
+        fields = line.split()
+        if len(fields) != 4 or fields[0] != mark or fields[1] != 'BEGIN':
+            continue
+        yield fields[2], body(fields[2], int(fields[3]))
+
+
+def collect_host(host, deadline):
+    """Collect one host's snapshot in a single SSH session.
+
+    Returns (records, gpus, host_epoch): the filtered PsRecords with their PSS
+    (KB) filled in, the GPU tuples from parse_gpu(), and the host's clock at
+    collection time (None if the agent didn't report it). If the output is
+    cut short, whatever sections arrived whole are still returned."""
+    want_ps, want_gpu = host in HOSTS, host in GPU_HOSTS
+    print(f"Checking host {host}", flush=True)
+    mark = f"---LA-{secrets.token_hex(4)}---"
+    records, pss_map, gpus, host_epoch = None, {}, None, None
+    output = stream_ssh(host, agent_command(mark, want_ps, want_gpu), deadline)
+    try:
+        for section, body in iter_frames(output, mark):
+            if section == 'clock':
+                clock = [line.strip() for line in body]
+                host_epoch = int(clock[0]) if clock and clock[0].isdigit() else None
+            elif section == 'ps':
+                records = list(parse_ps(body, MIN_CPUTIMES, EXCLUDE_USERS, EXCLUDE_PROCESSES))
+            elif section == 'pss':
+                pss_map = parse_pss(body)
+            elif section == 'gpu':
+                gpus = parse_gpu(list(body))
+            else:
+                for _ in body:
+                    pass
+    except TruncatedFrame as e:
+        sys.stderr.write(f"agent output from {host} ended inside its {e} section\n")
+    except TimeoutError as e:
+        sys.stderr.write(f"{e}\n")
+
+    if want_ps:
+        if records is None:
+            sys.stderr.write(f"no ps data from {host}\n")
+        elif records:
+            if pss_map:
+                print(f"  PSS collected for {len(pss_map)} PIDs on {host}", flush=True)
+            else:
+                print(f"  PSS collection failed on {host}", flush=True)
+        records = [rec._replace(pss=pss_map.get(rec.pid, 0)) for rec in records or []]
+    if want_gpu and gpus is None:
+        sys.stderr.write(f"GPU collection failed for {host}\n")
+    return records or [], gpus or [], host_epoch
+
+
+def parse_pss(lines):
+    """Parse read-pss.sh output ('pid|pss_kb', optionally 'PSS_DATA:'-prefixed)."""
+    pss_map = {}
+    for line_str in lines:
+        parts = line_str.strip().removeprefix('PSS_DATA:').split('|')
+        if len(parts) == 2:
+            try:
+                pss_map[int(parts[0])] = int(float(parts[1]))
+            except (ValueError, TypeError):
+                pass
+    return pss_map
+
+
+def parse_gpu(lines):
+    """Return (gpu_index, name, util, mem_used, mem_total, procs) tuples from
+    gpu-monitor.sh output."""
+    # Parse combined output: GPU stats, then process info, then ps data
+    gpu_lines = []
+    gpu_proc_lines = []
+    ps_lines = []
+    section = 'gpu'
+    for line in lines:
+        if line.strip() == '---GPU_PROCS---':
+            section = 'procs'
+            continue
+        elif line.strip() == '---PS_DATA---':
+            section = 'ps'
+            continue
+        if section == 'gpu':
+            gpu_lines.append(line)
+        elif section == 'procs':
+            gpu_proc_lines.append(line)
+        elif section == 'ps':
+            ps_lines.append(line)
+
+    # Build pid->user map
+    pid_user = {}
+    for ps_line in ps_lines:
+        ps_fields = ps_line.strip().split()
+        if len(ps_fields) >= 2:
+            pid_user[ps_fields[0]] = ps_fields[1]
+
+    # Parse GPU processes
+    procs = []
+    for gp_line in gpu_proc_lines:
+        gp_fields = [f.strip() for f in gp_line.split(",")]
+        if len(gp_fields) >= 3:
+            pid = gp_fields[0]
+            proc_name = gp_fields[1]
+            gpu_mem = gp_fields[2]
+            user = pid_user.get(pid, "?")
+            procs.append(f"{user}:{proc_name}({gpu_mem}MB)")
+    gpu_processes_str = ", ".join(procs) if procs else ""
+
+    gpus = []
+    for line in gpu_lines:
+        parts = [p.strip() for p in line.split(',')]
+        if len(parts) < 5:
+            continue
+
+        gpu_index = int(parts[0])
+        gpu_name = parts[1]
+        try:
+            utilization = float(parts[2])
+        except (ValueError, TypeError):
+            utilization = None
+        try:
+            mem_used = float(parts[3])
+        except (ValueError, TypeError):
+            mem_used = None
+        try:
+            mem_total = float(parts[4])
+        except (ValueError, TypeError):
+            mem_total = None
+        gpus.append((gpu_index, gpu_name, utilization, mem_used, mem_total, gpu_processes_str))
+    return gpus
+
+
+PROCESS_INSERT_SQL = """insert into processes (pid,ppid, username,comm,cputimes,rss,pss,vsz,thcount,etimes,bdstart,args,snapshot_time_epoch, snapshot_datetime, host) values (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)"""
+
+GPU_INSERT_SQL = """insert into gpu_stats
+    (host, gpu_index, gpu_name, utilization_pct, memory_used_mb, memory_total_mb,
+     gpu_processes, snapshot_time_epoch, snapshot_datetime)
+    values (%s, %s, %s, %s, %s, %s, %s, %s, %s)"""
+
+
+def log_batches(table, host, nrows, timings):
+    batches = ", ".join(f"{t * 1000:.0f}ms" for t in timings)
+    print(f"  {host}: wrote {nrows} {table} rows in {len(timings)} batch(es) "
+          f"[{batches}] total {sum(timings):.2f}s", flush=True)
+
+
+def insert_processes(host, records, epoch_time, datetime_time):
+    """Write one host snapshot to processes as batched multi-row inserts."""
+    batch = [(*rec, epoch_time, datetime_time, host) for rec in records]
+    if batch:
+        timings = db.insert_many(PROCESS_INSERT_SQL, batch, INSERT_BATCH_SIZE)
+        log_batches('processes', host, len(batch), timings)
+
+
+IDENTITY_INSERT_SQL = """insert ignore into process_identity
+    (id, host, pid, start_epoch, ppid, username, comm, bdstart, args)
+    values (%s, %s, %s, %s, %s, %s, %s, %s, %s)"""
+
+SAMPLE_INSERT_SQL = """insert into process_samples
+    (identity_id, cputimes, rss, pss, vsz, thcount, etimes, snapshot_time_epoch, snapshot_datetime)
+    values (%s, %s, %s, %s, %s, %s, %s, %s, %s)"""
+
+# host -> {pid: (start_epoch, identity_id)} for the processes seen last cycle.
+# Owned by the main thread, like the DB connection.
+identity_cache = {}
+
+
+def resolve_identities(host, records, host_epoch):
+    """Map each record to its process_identity id, inserting unseen identities.
+
+    Hits come from identity_cache; misses (new processes, or everything after
+    a restart) are checked against the table in one query before inserting."""
+    cached = identity_cache.get(host, {})
+    seen, misses = {}, []
+    for rec in records:
+        start = host_epoch - rec.etimes
+        hit = cached.get(rec.pid)
+        if hit and abs(hit[0] - start) <= START_TOLERANCE_SECS:
+            seen[rec.pid] = hit
+        else:
+            misses.append((rec, start))
+
+    if misses:
+        known = {}
+        pids = [rec.pid for rec, _ in misses]
+        placeholders = ",".join(["%s"] * len(pids))
+        for pid, start_epoch, iid in db.query(
+                f"select pid, start_epoch, id from process_identity "
+                f"where host = %s and pid in ({placeholders})", [host] + pids):
+            known.setdefault(pid, []).append((start_epoch, iid))
+        new = []
+        for rec, start in misses:
+            match = next((k for k in known.get(rec.pid, [])
+                          if abs(k[0] - start) <= START_TOLERANCE_SECS), None)
+            if match is None:
+                match = (start, identity_id(host, rec.pid, start))
+                new.append((match[1], host, rec.pid, start, rec.ppid, rec.username,
+                            rec.comm, rec.bdstart, rec.args))
+            seen[rec.pid] = match
+        if new:
+            timings = db.insert_many(IDENTITY_INSERT_SQL, new, INSERT_BATCH_SIZE)
+            log_batches('process_identity', host, len(new), timings)
+
+    identity_cache[host] = seen
+    return {pid: iid for pid, (_, iid) in seen.items()}
+
+
+def insert_process_samples(host, records, host_epoch, epoch_time, datetime_time):
+    """Compact-mode write: new identities once, then per-cycle metrics only."""
+    if not records:
+        return
+    ids = resolve_identities(host, records, host_epoch or epoch_time)
+    batch = [(ids[rec.pid], rec.cputimes, rec.rss, rec.pss, rec.vsz, rec.thcount,
+              rec.etimes, epoch_time, datetime_time) for rec in records]
+    timings = db.insert_many(SAMPLE_INSERT_SQL, batch, INSERT_BATCH_SIZE)
+    log_batches('process_samples', host, len(batch), timings)
+
+
+def insert_gpu_stats(host, gpus, epoch_time, datetime_time):
+    batch = []
+    for gpu_index, gpu_name, utilization, mem_used, mem_total, gpu_processes_str in gpus:
+        batch.append((
+            host, gpu_index, gpu_name, utilization, mem_used, mem_total,
+            gpu_processes_str or None, epoch_time, datetime_time))
+        print(f"GPU {gpu_index} on {host}: {utilization}% util, {mem_used}/{mem_total} MB, procs: {gpu_processes_str}")
+    if batch:
+        timings = db.insert_many(GPU_INSERT_SQL, batch, INSERT_BATCH_SIZE)
+        log_batches('gpu_stats', host, len(batch), timings)
+
+
+# All hosts are sampled concurrently so every snapshot in a cycle is taken
+# close to epoch_time (serial collection let one slow node push the later hosts
+# minutes behind, skewing the cpu_norm deltas). Collection runs on the worker
+# threads; inserts stay on the main thread, which owns the MySQL connection.
+MAX_WORKERS = _hosts_cfg.get('max_workers', 16)
+HOST_DEADLINE_SECS = _hosts_cfg.get('host_deadline_secs', 60)
+# Rows per multi-row INSERT; a whole host snapshot is still one transaction.
+INSERT_BATCH_SIZE = _hosts_cfg.get('insert_batch_size', 1000)
+
 print("Starting up...", flush=True)
+pool = ThreadPoolExecutor(max_workers=MAX_WORKERS)
 while True:
     epoch_time = int(time.time())
     os.environ['TZ'] = 'America/Los_Angeles'
     time.tzset()
     datetime_time = time.strftime('%Y-%m-%d %H:%M:%S')
-    for host in HOSTS:
-        print(f"Checking host {host}", flush=True)
-        ssh = subprocess.Popen(["ssh"] + SSH_OPTS + [f"{SSH_USER}@{host}", COMMAND],
-                               shell=False,
-                               stdout=subprocess.PIPE,
-                               stderr=subprocess.PIPE)
-        print(f"command: ssh {SSH_USER}@{host} {COMMAND[:80]}...")
-        result = ssh.stdout.readlines()
-        ssh.wait()  # reap child process to prevent zombies
-        if result == []:
-            error = ssh.stderr.readlines()
-            sys.stderr.write(f"error: {error}\n")
-
-        # First pass: parse ps output and collect filtered PIDs
-        filtered_rows = []
-        for line in result[1:]:
-            string_line = line.strip().decode("utf-8")
-            sarray = string_line.split('|')
-
-            sarray = [element.split()[1:] for element in sarray]
-
-            sarray = sarray[1:]
-
-            sarray = list(map(' '.join, sarray))
-
-            user = sarray[2]
-            process = sarray[3]
-            cputime = int(sarray[4])
-            if cputime < 10:
-                continue
-
-            if user in exclude_users:
-                continue
-            if process in exclude_processes:
-                continue
-
-            filtered_rows.append(sarray)
-
-        # Collect PSS for all filtered PIDs in a single SSH call
-        pss_map = {}
-        if filtered_rows:
-            pids = [row[0] for row in filtered_rows]
-            pss_cmd = "sudo /usr/local/bin/read-pss.sh " + " ".join(pids)
-            pss_ssh = subprocess.Popen(
-                ["ssh"] + SSH_OPTS + [f"{SSH_USER}@{host}", pss_cmd],
-                shell=False, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            pss_result = pss_ssh.stdout.readlines()
-            pss_ssh.wait()
-            for pss_line in pss_result:
-                line_str = pss_line.strip().decode("utf-8")
-                parts = line_str.split('|')
-                if len(parts) == 2:
-                    try:
-                        pss_map[parts[0]] = int(float(parts[1]))
-                    except (ValueError, TypeError):
-                        pass
-            if pss_map:
-                print(f"  PSS collected for {len(pss_map)} PIDs on {host}", flush=True)
-            else:
-                print(f"  PSS collection failed on {host}", flush=True)
+    deadline = time.time() + HOST_DEADLINE_SECS
 
-        # Insert rows with PSS data
-        for sarray in filtered_rows:
-            pid_str = sarray[0]
-            pss_kb = pss_map.get(pid_str, 0)
-
-            print(".", end='')
-
-            sql = """insert into processes (pid,ppid, username,comm,cputimes,rss,pss,vsz,thcount,etimes,bdstart,args,snapshot_time_epoch, snapshot_datetime, host) values (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)"""
-            args = []
-            for element in sarray:
-                try:
-                    intelem = int(element)
-                    args.append(intelem)
-                except Exception:
-                    args.append(element)
-            # Insert PSS after rss — rss is at index 5, so PSS goes at index 6
-            args.insert(6, pss_kb)
-            args.append(epoch_time)
-            args.append(datetime_time)
-
-            args.append(host)
-
-            cursor = db.get_cursor()
-            cursor.execute(sql, args)
-            db.commit()
-        print(f"{host}")
-
-    # Collect GPU stats from GPU-equipped hosts
-    for host in GPU_HOSTS:
-        print(f"Checking GPU on {host}", flush=True)
+    hosts = HOSTS + [h for h in GPU_HOSTS if h not in HOSTS]
+    futures = {pool.submit(collect_host, host, deadline): host for host in hosts}
+    for future in as_completed(futures):
+        host = futures[future]
         try:
-            ssh_cmd = ["ssh"] + SSH_OPTS + [f"{SSH_USER}@{host}", "/usr/local/bin/gpu-monitor.sh"]
-            stdout, stderr, rc = ssh_with_timeout(ssh_cmd, timeout_secs=30)
-            if stdout is None:
-                sys.stderr.write(f"GPU collection timed out for {host}\n")
-                continue
-            output = stdout.strip()
-            if not output:
-                if stderr:
-                    sys.stderr.write(f"GPU error on {host}: {stderr}\n")
-                continue
-
-            # Parse combined output: GPU stats, then process info, then ps data
-            gpu_lines = []
-            gpu_proc_lines = []
-            ps_lines = []
-            section = 'gpu'
-            for line in output.split('\n'):
-                if line.strip() == '---GPU_PROCS---':
-                    section = 'procs'
-                    continue
-                elif line.strip() == '---PS_DATA---':
-                    section = 'ps'
-                    continue
-                if section == 'gpu':
-                    gpu_lines.append(line)
-                elif section == 'procs':
-                    gpu_proc_lines.append(line)
-                elif section == 'ps':
-                    ps_lines.append(line)
-
-            # Build pid->user map
-            pid_user = {}
-            for ps_line in ps_lines:
-                ps_fields = ps_line.strip().split()
-                if len(ps_fields) >= 2:
-                    pid_user[ps_fields[0]] = ps_fields[1]
-
-            # Parse GPU processes
-            procs = []
-            for gp_line in gpu_proc_lines:
-                gp_fields = [f.strip() for f in gp_line.split(",")]
-                if len(gp_fields) >= 3:
-                    pid = gp_fields[0]
-                    proc_name = gp_fields[1]
-                    gpu_mem = gp_fields[2]
-                    user = pid_user.get(pid, "?")
-                    procs.append(f"{user}:{proc_name}({gpu_mem}MB)")
-            gpu_processes_str = ", ".join(procs) if procs else ""
-
-            for line in gpu_lines:
-                parts = [p.strip() for p in line.split(',')]
-                if len(parts) < 5:
-                    continue
-
-                gpu_index = int(parts[0])
-                gpu_name = parts[1]
-                try:
-                    utilization = float(parts[2])
-                except (ValueError, TypeError):
-                    utilization = None
-                try:
-                    mem_used = float(parts[3])
-                except (ValueError, TypeError):
-                    mem_used = None
-                try:
-                    mem_total = float(parts[4])
-                except (ValueError, TypeError):
-                    mem_total = None
-
-                gpu_insert_sql = """insert into gpu_stats
-                    (host, gpu_index, gpu_name, utilization_pct, memory_used_mb, memory_total_mb,
-                     gpu_processes, snapshot_time_epoch, snapshot_datetime)
-                    values (%s, %s, %s, %s, %s, %s, %s, %s, %s)"""
-                cursor = db.get_cursor()
-                cursor.execute(gpu_insert_sql, (
-                    host, gpu_index, gpu_name, utilization, mem_used, mem_total,
-                    gpu_processes_str or None, epoch_time, datetime_time))
-                db.commit()
-                print(f"GPU {gpu_index} on {host}: {utilization}% util, {mem_used}/{mem_total} MB, procs: {gpu_processes_str}")
+            rows, gpus, host_epoch = future.result()
         except Exception as e:
-            sys.stderr.write(f"GPU collection failed for {host}: {e}\n")
+            sys.stderr.write(f"collection failed for {host}: {e}\n")
+            continue
+        if PROCESS_STORAGE == 'compact':
+            insert_process_samples(host, rows, host_epoch, epoch_time, datetime_time)
+        else:
+            insert_processes(host, rows, epoch_time, datetime_time)
+        insert_gpu_stats(host, gpus, epoch_time, datetime_time)
+    print(f"Cycle took {time.time() - epoch_time:.1f}s", flush=True)
 
     time.sleep(5 * 60)
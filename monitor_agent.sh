@@ -0,0 +1,56 @@
+# Remote half of monitor.py — run as the SSH command on each monitored host so
+# one session returns everything the collector needs for a cycle.
+#
+# monitor.py prepends the settings below and parses the output:
+#   LA_MARK     frame marker, unique per cycle
+#   LA_PS       1 to return the ps listing + PSS, 0 to skip (GPU-only hosts)
+#   LA_PS_CMD   the ps command whose columns monitor.py parses
+#   LA_MIN_CPU  only PIDs with at least this many CPU seconds get a PSS read
+#   LA_EXCLUDE_USERS, LA_EXCLUDE_PROCESSES
+#               '|'-separated users and command names whose PIDs get no PSS
+#               read either (monitor.py drops them from the listing anyway)
+#   LA_GPU      1 to run gpu-monitor.sh
+#
+# Each section is framed as
+#   <LA_MARK> BEGIN <name> <line count>
+#   ...exactly <line count> lines...
+#   <LA_MARK> END <name>
+# so anything a login script prints (see MONITORING_NOTES.md, the .bashrc that
+# dumps a full ps listing) falls outside the frames and is ignored.
+
+emit() {
+    body=$(cat)
+    if [ -n "$body" ]; then
+        n=$(printf '%s\n' "$body" | wc -l)
+    else
+        n=0
+    fi
+    printf '%s BEGIN %s %d\n' "$LA_MARK" "$1" "$n"
+    [ "$n" -gt 0 ] && printf '%s\n' "$body"
+    printf '%s END %s\n' "$LA_MARK" "$1"
+}
+
+# Host clock, so monitor.py can turn etimes into a stable process start time.
+date +%s | emit clock
+
+if [ "$LA_PS" = 1 ]; then
+    listing=$(eval "$LA_PS_CMD" 2>/dev/null)
+    printf '%s\n' "$listing" | emit ps
+    # PIDs that monitor.py's parse_ps keeps, picked from the same listing with
+    # the same filters. Each field is "|<pid> <value>".
+    pids=$(printf '%s\n' "$listing" | awk -F'|' -v min="$LA_MIN_CPU" \
+        -v users="|$LA_EXCLUDE_USERS|" -v comms="|$LA_EXCLUDE_PROCESSES|" '
+        function value(f) { sub(/^[ \t]*[0-9]+[ \t]*/, "", f); sub(/[ \t]+$/, "", f); gsub(/[ \t]+/, " ", f); return f }
+        NR > 1 && NF >= 12 && value($6) ~ /^[0-9]+$/ && value($6) + 0 >= min &&
+            !index(users, "|" value($4) "|") && !index(comms, "|" value($5) "|") { print value($2) }')
+    if [ -n "$pids" ]; then
+        # shellcheck disable=SC2086
+        sudo -n /usr/local/bin/read-pss.sh $pids 2>/dev/null | emit pss
+    else
+        : | emit pss
+    fi
+fi
+
+if [ "$LA_GPU" = 1 ]; then
+    /usr/local/bin/gpu-monitor.sh 2>/dev/null | emit gpu
+fi
@@ -2,10 +2,18 @@
 """Cron job: reads raw processes from MySQL, computes cpu_norm, writes to load_summary table."""
 import logging
 import sys
+import time
+import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
-from sqlalchemy import create_engine, text
-from app.config import DB_CONFIG
+from datetime import date, datetime, timedelta
+from sqlalchemy import bindparam, create_engine, text
+from app import archive
+from app.compact import START_TOLERANCE_SECS, identity_id
+from app.config import DB_CONFIG, PROCESS_TABLE
+from app.partitions import (
+    INDEXES_SQL, PARTITION_AHEAD_DAYS, PARTITIONS_SQL, PROCESS_INDEXES, REPLACED_INDEXES, TABLE as RAW_TABLE,
+    add_partitions_sql, partition_day, partitioning,
+)
 
 logging.basicConfig(
     level=logging.INFO,
@@ -25,6 +33,19 @@ def get_engine():
     )
 
 
+# Rollups of load_summary: (table, bucket seconds, table it is built from).
+# Per (bucket, host, username, comm) they hold the sums of cpu_norm and of mem
+# (pss, or rss where there is no pss) over the 5-min rows in the bucket, how
+# many 5-min rows that was (samples) and how many 5-min snapshots the host had
+# in the bucket (snapshots), so the API can rebuild both its per-bucket means
+# and exact totals. Each level is built from the one below it.
+ROLLUPS = [
+    ('load_summary_30m', 1800, 'load_summary'),
+    ('load_summary_2h', 7200, 'load_summary_30m'),
+    ('load_summary_1d', 86400, 'load_summary_2h'),
+]
+
+
 def ensure_table(engine):
     with engine.begin() as conn:
         conn.execute(text("""
@@ -46,6 +67,22 @@ def ensure_table(engine):
             logger.info("Added pss column to load_summary")
         except Exception:
             pass  # Column already exists
+        # Coarser pre-aggregates of load_summary for long-range dashboard views
+        for table, _, _ in ROLLUPS:
+            conn.execute(text(f"""
+                CREATE TABLE IF NOT EXISTS {table} (
+                    snapshot_datetime DATETIME NOT NULL,
+                    host VARCHAR(20) NOT NULL,
+                    username VARCHAR(50) NOT NULL,
+                    comm VARCHAR(100) NOT NULL,
+                    cpu_norm DOUBLE NOT NULL DEFAULT 0,
+                    mem DOUBLE NOT NULL DEFAULT 0,
+                    samples INT NOT NULL DEFAULT 0,
+                    snapshots INT NOT NULL DEFAULT 0,
+                    PRIMARY KEY (snapshot_datetime, host, username, comm),
+                    INDEX idx_host_time (host, snapshot_datetime)
+                )
+            """))
         # Per-process peak-stats table backing the Processes tab (avoids GROUP BY
         # over the 200M+ row processes table on every request).
         conn.execute(text("""
@@ -87,13 +124,13 @@ def update_process_summary(engine):
     """Upsert the last day's per-process peak stats into process_summary and prune
     rows older than the longest dashboard window (90d). Idempotent (GREATEST/LEAST)."""
     with engine.begin() as conn:
-        conn.execute(text("""
+        conn.execute(text(f"""
             INSERT INTO process_summary (host,pid,username,comm,args,peak_rss,peak_pss,
                 max_cputimes,max_thcount,max_etimes,first_seen,last_seen,snapshot_count)
             SELECT host,pid,username,comm, SUBSTRING(MAX(args),1,500),
                    MAX(rss), MAX(pss), MAX(cputimes), MAX(thcount), MAX(etimes),
                    MIN(snapshot_datetime), MAX(snapshot_datetime), COUNT(*)
-            FROM processes WHERE snapshot_datetime >= NOW() - INTERVAL 1 DAY
+            FROM {PROCESS_TABLE} WHERE snapshot_datetime >= NOW() - INTERVAL 1 DAY
             GROUP BY host,pid,username,comm
             ON DUPLICATE KEY UPDATE
                 args=VALUES(args),
@@ -110,94 +147,669 @@ def update_process_summary(engine):
     logger.info("Updated process_summary (1-day upsert + 90d prune)")
 
 
-def process_data():
+# Filter out system/service accounts — only show real user load
+EXCLUDE_USERS = {
+    'root', 'daemon', 'bin', 'sys', 'sync', 'games', 'man', 'lp', 'mail',
+    'news', 'uucp', 'proxy', 'www-data', 'backup', 'list', 'irc', 'gnats',
+    'nobody', 'systemd-network', 'systemd-resolve', 'syslog', 'messagebus',
+    '_apt', 'lxd', 'uuidd', 'dnsmasq', 'landscape', 'pollinate', 'sshd',
+    'sssd', 'statd', 'ntp', 'nagios', 'scan', 'sophosav', 'zabbix', 'tss',
+    'tcpdump', '_rpc', 'usbmux', 'avahi', 'netdata', 'gdm',
+    'gnome-remote-desktop', 'ntpsec', 'nx', 'polkitd', 'rstudio-server',
+    'sophos-spl-av', 'sophos-spl-local', 'sophos-spl-updatescheduler',
+    'sophos-spl-user',
+    'rtkit',
+    'munge',
+}
+
+# monitor.py writes a cycle's hosts as they finish (up to its per-cycle
+# deadline), so the incremental run leaves the newest snapshots alone until
+# every host's rows for them have landed.
+SETTLE_SECS = 120
+# Rows can still land after the watermark has passed their snapshot (an insert
+# that outlived SETTLE_SECS, a monitor catching up after an outage). The raw
+# rows folded per (host, snapshot) are counted for this long, and every
+# incremental run rebuilds the buckets where MySQL now holds more.
+LATE_LOOKBACK_SECS = 6 * 3600
+# snapshot_datetime is naive local time, which repeats an hour when DST ends,
+# so its bound on the incremental scan (there for the time index) sits this far
+# below the watermark's; the snapshot_time_epoch bound makes the exact cut.
+DATETIME_SLACK = timedelta(hours=2)
+# Per-(host, pid) CPU state older than this belongs to exited processes.
+PID_STATE_RETENTION_SECS = 86400
+
+SUMMARY_COLUMNS = ['snapshot_datetime', 'host', 'username', 'comm', 'cpu_norm', 'rss', 'pss']
+PID_STATE_COLUMNS = ['host', 'pid', 'cputimes', 'snapshot_time_epoch']
+
+# The only raw columns the aggregation reads, with the compact dtypes each
+# streamed chunk is cast to (the low-cardinality strings as categoricals).
+RAW_DTYPES = {
+    'host': 'category',
+    'pid': 'int32',
+    'username': 'category',
+    'comm': 'category',
+    'cputimes': 'int64',
+    'rss': 'float32',
+    'pss': 'float32',
+    'snapshot_time_epoch': 'int64',
+    'snapshot_datetime': 'datetime64[ns]',
+}
+CHUNK_ROWS = 250_000
+# How far before a rebuilt range to look for each pid's previous sample
+# (a few monitor cycles), so the range's first snapshot still gets deltas.
+SEED_LOOKBACK = timedelta(minutes=15)
+
+
+def ensure_state_tables(engine):
+    with engine.begin() as conn:
+        # High-water mark of the incremental aggregation: the newest raw
+        # snapshot already folded into load_summary.
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS load_summary_watermark (
+                name VARCHAR(32) NOT NULL PRIMARY KEY,
+                snapshot_time_epoch INT NOT NULL,
+                snapshot_datetime DATETIME NOT NULL,
+                updated_at DATETIME NOT NULL
+            )
+        """))
+        # Last-seen cputimes per process, so the first new snapshot of a pid
+        # still gets a cpu_norm delta.
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS load_summary_pid_state (
+                host VARCHAR(20) NOT NULL,
+                pid INT NOT NULL,
+                cputimes BIGINT NOT NULL,
+                snapshot_time_epoch INT NOT NULL,
+                PRIMARY KEY (host, pid),
+                INDEX idx_pid_state_epoch (snapshot_time_epoch)
+            )
+        """))
+        # Raw rows folded per (host, snapshot) over the last LATE_LOOKBACK_SECS,
+        # to spot rows that arrived after the watermark passed them.
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS load_summary_folded (
+                host VARCHAR(20) NOT NULL,
+                snapshot_time_epoch INT NOT NULL,
+                raw_rows INT NOT NULL,
+                PRIMARY KEY (snapshot_time_epoch, host)
+            )
+        """))
+
+
+def partition_processes(engine):
+    """One-off migration of an unpartitioned `processes` table to the daily
+    layout and indexes of app/partitions.py.
+
+    This rebuilds the whole table (hours on 200M+ rows, with writes blocked
+    meanwhile), so it only runs when asked: `process_data_job.py --partition-processes`."""
+    if PROCESS_TABLE != RAW_TABLE:
+        logger.info(f"PROCESS_TABLE is {PROCESS_TABLE}; nothing to partition")
+        return
+    with engine.connect() as conn:
+        if conn.execute(text(PARTITIONS_SQL)).first() is not None:
+            logger.info(f"{RAW_TABLE} is already partitioned")
+            return
+        first = conn.execute(text(f"SELECT MIN(snapshot_datetime) FROM {RAW_TABLE}")).scalar()
+        indexes = set(conn.execute(text(INDEXES_SQL)).scalars())
+    today = date.today()
+    first = first.date() if first is not None else today
+    changes = [f"DROP INDEX {name}" for name in REPLACED_INDEXES if name in indexes]
+    changes += [f"ADD INDEX {name} {cols}" for name, cols in PROCESS_INDEXES.items() if name not in indexes]
+    logger.info(f"Partitioning {RAW_TABLE} by day from {first} ({', '.join(changes) or 'indexes unchanged'})")
+    t0 = time.time()
+    with engine.begin() as conn:
+        conn.execute(text(f"ALTER TABLE {RAW_TABLE} {', '.join(changes)} "
+                          f"{partitioning(first, today + timedelta(days=PARTITION_AHEAD_DAYS))}"))
+    logger.info(f"Partitioned {RAW_TABLE} in {time.time() - t0:.0f}s")
+
+
+# Columns of the wide `processes` rows, as migrate_to_compact reads them
+WIDE_COLUMNS = ['pid', 'ppid', 'username', 'comm', 'cputimes', 'rss', 'pss', 'vsz', 'thcount', 'etimes',
+                'bdstart', 'args', 'snapshot_time_epoch', 'snapshot_datetime']
+# pids per process_identity lookup
+IDENTITY_LOOKUP_BATCH = 1000
+
+
+def _identities(conn, host, df):
+    """Identity id for each of one host's wide rows (sorted by pid, then time)
+    and the process_identity rows to insert for the ones not there yet.
+
+    Consecutive samples of a pid belong to one process while their derived
+    start time holds (monitor.resolve_identities' rule); identities already
+    in the table, e.g. created by monitor.py, are reused."""
+    start = df['snapshot_time_epoch'] - df['etimes']
+    first = (df['pid'] != df['pid'].shift()) | ((start - start.shift()).abs() > START_TOLERANCE_SECS)
+    known = {}
+    pids = [int(pid) for pid in df.loc[first, 'pid'].unique()]
+    lookup = text("SELECT pid, start_epoch, id FROM process_identity WHERE host = :host AND pid IN :pids"
+                  ).bindparams(bindparam('pids', expanding=True))
+    for i in range(0, len(pids), IDENTITY_LOOKUP_BATCH):
+        for pid, start_epoch, iid in conn.execute(lookup, {'host': host, 'pids': pids[i:i + IDENTITY_LOOKUP_BATCH]}):
+            known.setdefault(pid, []).append((start_epoch, iid))
+    ids, new = [], []
+    for rec in df.loc[first].assign(start_epoch=start[first]).itertuples(index=False):
+        pid, start_epoch = int(rec.pid), int(rec.start_epoch)
+        match = next((iid for s, iid in known.get(pid, []) if abs(s - start_epoch) <= START_TOLERANCE_SECS), None)
+        if match is None:
+            match = identity_id(host, pid, start_epoch)
+            known.setdefault(pid, []).append((start_epoch, match))
+            new.append({'id': match, 'host': host, 'pid': pid, 'start_epoch': start_epoch,
+                        'ppid': None if pd.isna(rec.ppid) else int(rec.ppid), 'username': rec.username,
+                        'comm': rec.comm, 'bdstart': None if pd.isna(rec.bdstart) else rec.bdstart,
+                        'args': rec.args})
+        ids.append(match)
+    # each row takes its process's id (ids are 63-bit: no float round trip)
+    return np.array(ids, dtype=np.int64)[first.cumsum().to_numpy() - 1], new
+
+
+def migrate_to_compact(engine):
+    """One-off move of the wide `processes` history into the compact tables,
+    once PROCESS_STORAGE is 'compact' (and monitor.py, which creates them, has
+    been restarted): `process_data_job.py --migrate-to-compact`.
+
+    Goes a day and host at a time, oldest first. Each is copied into
+    process_identity/process_samples and deleted from `processes` in one
+    transaction, so an interrupted run carries on where it stopped, and the
+    readers of processes_compact see each row exactly once throughout. Rows
+    without a host or pid (which no reader uses) are dropped. `processes` is
+    left empty, to be dropped by hand."""
+    if PROCESS_TABLE == RAW_TABLE:
+        logger.error("Set PROCESS_STORAGE = 'compact' and restart monitor.py before migrating")
+        return
+    t0 = time.time()
+    moved = 0
+    while True:
+        with engine.connect() as conn:
+            first = conn.execute(text(f"SELECT MIN(snapshot_datetime) FROM {RAW_TABLE}")).scalar()
+            if first is None:
+                break
+            day = pd.Timestamp(first).normalize().to_pydatetime()
+            params = {'s': day, 'e': day + timedelta(days=1)}
+            hosts = conn.execute(text(
+                f"SELECT DISTINCT host FROM {RAW_TABLE} WHERE snapshot_datetime >= :s AND snapshot_datetime < :e"
+            ), params).scalars().all()
+        for host in hosts:
+            where = "host <=> :host AND snapshot_datetime >= :s AND snapshot_datetime < :e"
+            with engine.begin() as conn:
+                df = pd.read_sql(text(f"SELECT {', '.join(WIDE_COLUMNS)} FROM {RAW_TABLE} WHERE {where} "
+                                      "ORDER BY pid, snapshot_time_epoch"),
+                                 conn, params={**params, 'host': host}, parse_dates=['snapshot_datetime'])
+                df = df.dropna(subset=['pid']).reset_index(drop=True) if host is not None else df.iloc[:0]
+                if not df.empty:
+                    ids, new = _identities(conn, host, df)
+                    if new:
+                        conn.execute(text(
+                            "INSERT IGNORE INTO process_identity "
+                            "(id, host, pid, start_epoch, ppid, username, comm, bdstart, args) "
+                            "VALUES (:id, :host, :pid, :start_epoch, :ppid, :username, :comm, :bdstart, :args)"
+                        ), new)
+                    conn.execute(text(
+                        "INSERT INTO process_samples (identity_id, cputimes, rss, pss, vsz, thcount, etimes, "
+                        "snapshot_time_epoch, snapshot_datetime) VALUES (:identity_id, :cputimes, :rss, :pss, "
+                        ":vsz, :thcount, :etimes, :snapshot_time_epoch, :snapshot_datetime)"
+                    ), [{'identity_id': int(iid), 'cputimes': int(r.cputimes), 'rss': int(r.rss), 'pss': int(r.pss),
+                         'vsz': int(r.vsz), 'thcount': int(r.thcount), 'etimes': int(r.etimes),
+                         'snapshot_time_epoch': int(r.snapshot_time_epoch),
+                         'snapshot_datetime': r.snapshot_datetime.to_pydatetime()}
+                        for iid, r in zip(ids, df.itertuples(index=False))])
+                deleted = conn.execute(text(f"DELETE FROM {RAW_TABLE} WHERE {where}"),
+                                       {**params, 'host': host}).rowcount
+            moved += len(df)
+            if deleted != len(df):
+                logger.warning(f"Dropped {deleted - len(df)} {RAW_TABLE} rows without a host or pid")
+        logger.info(f"Moved {day:%Y-%m-%d} to the compact tables ({moved} rows so far, {time.time() - t0:.0f}s)")
+    logger.info(f"Migrated {moved} rows; {RAW_TABLE} is empty and can be dropped")
+
+
+def maintain_process_partitions(engine):
+    """Keep PARTITION_AHEAD_DAYS of daily `processes` partitions created ahead of
+    today (old ones are archived and dropped by retention_job.py). Does nothing
+    until the table is partitioned (partition_processes)."""
+    if PROCESS_TABLE != RAW_TABLE:
+        return
+    with engine.connect() as conn:
+        names = list(conn.execute(text(PARTITIONS_SQL)).scalars())
+    days = {partition_day(name): name for name in names if partition_day(name) is not None}
+    if not days:
+        return
+    ahead = date.today() + timedelta(days=PARTITION_AHEAD_DAYS)
+    last = max(days)
+    if last < ahead:
+        with engine.begin() as conn:
+            conn.execute(text(add_partitions_sql(last + timedelta(days=1), ahead)))
+        logger.info(f"Added {RAW_TABLE} partitions through {ahead}")
+
+
+def filter_user_rows(df):
+    df = df[~df['username'].isin(EXCLUDE_USERS)]
+    # Also exclude usernames that look like system accounts (sophos-*, etc.)
+    df = df[~df['username'].str.startswith('sophos-')]
+    # Exclude numeric-only usernames (unresolved UIDs)
+    return df[~df['username'].str.match(r'^\d+$')]
+
+
+def compute_summary(df, seed=None):
+    """Turn raw process snapshots into 5-min load_summary rows.
+
+    `seed` holds the previous sample (host, pid, cputimes, snapshot_time_epoch)
+    of processes seen before `df` starts, so their first row in `df` gets a
+    CPU delta instead of being dropped. Returns (summary, last) where `last` is
+    the newest sample per (host, pid) — the seed for the next slice."""
+    df = df.sort_values(by='snapshot_time_epoch', ascending=True, kind='stable')
+    last = df.groupby(['host', 'pid'], observed=True).tail(1)[PID_STATE_COLUMNS]
+
+    df = df.copy()
+    df['rss'] = (df['rss'] / 1000000).round(4)  # KB to GB
+    if 'pss' in df.columns:
+        df['pss'] = (df['pss'] / 1000000).round(4)  # KB to GB
+    else:
+        df['pss'] = 0.0
+    if seed is not None and not seed.empty:
+        df['seed'] = False
+        df = pd.concat([seed.assign(seed=True), df], ignore_index=True)
+    # Compute cpu_norm: normalized CPU usage (cores consumed per second)
+    by_pid = df.groupby(['host', 'pid'], observed=True)
+    df['cpu_diff'] = (df['cputimes'] - by_pid['cputimes'].shift()).fillna(0)
+    df['seconds_diff'] = (df['snapshot_time_epoch'] - by_pid['snapshot_time_epoch'].shift()).fillna(0)
+    df['cpu_norm'] = (df['cpu_diff'].div(df['seconds_diff'])).fillna(0).replace([float('inf'), float('-inf')], 0)
+    if 'seed' in df.columns:
+        df = df[~df['seed'].astype(bool)]
+    df = df[(df['cpu_norm'] > 0) & (df['cpu_norm'] < 10000)]  # Filter out unreasonable values
+
+    # Aggregate to 5-min buckets per (host, username, comm)
+    summary = df.groupby([
+        pd.Grouper(key='snapshot_datetime', freq='5min'),
+        'host', 'username', 'comm'
+    ], observed=True).agg(
+        cpu_norm=('cpu_norm', 'sum'),
+        rss=('rss', 'sum'),
+        pss=('pss', 'sum'),
+    ).reset_index()
+
+    summary = summary[(summary['cpu_norm'] > 0) | (summary['rss'] > 0)]
+    summary['cpu_norm'] = summary['cpu_norm'].round(4)
+    summary['rss'] = summary['rss'].round(4)
+    summary['pss'] = summary['pss'].round(4)
+    return summary, last
+
+
+def iter_raw_chunks(engine, where, params, chunksize=CHUNK_ROWS):
+    """Stream raw snapshots matching `where`, oldest first, in compact chunks.
+
+    Only RAW_COLUMNS are selected (never the wide args/bdstart), rows come
+    through a server-side cursor, and each chunk is cast to RAW_DTYPES, so
+    memory is bounded by `chunksize` whatever the time range."""
+    sql = text(f"SELECT {', '.join(RAW_DTYPES)} FROM {PROCESS_TABLE} "
+               f"WHERE {where} ORDER BY snapshot_datetime")
+    with engine.connect() as conn:
+        conn = conn.execution_options(stream_results=True)
+        for chunk in pd.read_sql(sql, conn, params=params, chunksize=chunksize):
+            yield chunk.dropna(subset=['pid']).astype(RAW_DTYPES)
+
+
+def _archived_until():
+    """Where the Parquet archive of old raw rows ends (whichever storage they
+    were written in), or None when nothing is archived."""
+    return archive.archived_until(RAW_TABLE)
+
+
+def iter_raw_range(engine, start, end, chunksize=CHUNK_ROWS):
+    """iter_raw_chunks over [start, end), reading the days retention_job.py
+    has moved out of MySQL from the archive instead."""
+    until = _archived_until()
+    if until is not None and start < until:
+        for chunk in archive.iter_chunks(RAW_TABLE, start, min(end, until), list(RAW_DTYPES)):
+            yield chunk.astype(RAW_DTYPES)
+        start = max(start, until)
+    if start < end:
+        yield from iter_raw_chunks(engine, "snapshot_datetime >= :s AND snapshot_datetime < :e",
+                                   {'s': start, 'e': end}, chunksize)
+
+
+def aggregate_stream(chunks, write, seed=None):
+    """Fold streamed raw chunks into load_summary rows.
+
+    Per-pid CPU state carries across chunk boundaries (it seeds the next
+    chunk's deltas), and the 5-min bucket still open at the end of a chunk is
+    held back and merged with the next chunk's share of it, so `write` gets
+    every finished bucket exactly once. Returns (last, watermark, raw_rows,
+    summary_rows); watermark is None if no rows were read."""
+    last, pending, watermark = seed, None, None
+    raw_rows = summary_rows = 0
+    for chunk in chunks:
+        if chunk.empty:
+            continue
+        raw_rows += len(chunk)
+        watermark = (int(chunk['snapshot_time_epoch'].max()), chunk['snapshot_datetime'].max())
+        open_bucket = watermark[1].floor('5min')
+
+        summary, chunk_last = compute_summary(filter_user_rows(chunk), last)
+        if last is None or last.empty:
+            last = chunk_last
+        else:
+            last = pd.concat([last, chunk_last], ignore_index=True).groupby(
+                ['host', 'pid'], observed=True).tail(1)
+        if pending is not None:
+            summary = pd.concat([pending, summary], ignore_index=True).groupby(
+                ['snapshot_datetime', 'host', 'username', 'comm'], observed=True
+            )[['cpu_norm', 'rss', 'pss']].sum().reset_index()
+
+        done = summary['snapshot_datetime'] < open_bucket
+        if done.any():
+            write(summary[done])
+            summary_rows += int(done.sum())
+        pending = summary[~done]
+    if pending is not None and not pending.empty:
+        write(pending)
+        summary_rows += len(pending)
+    return last, watermark, raw_rows, summary_rows
+
+
+def save_state(conn, last, watermark):
+    """Upsert per-pid CPU state and move the watermark (inside the caller's txn)."""
+    if not last.empty:
+        conn.execute(text("""
+            INSERT INTO load_summary_pid_state (host, pid, cputimes, snapshot_time_epoch)
+            VALUES (:host, :pid, :cputimes, :snapshot_time_epoch)
+            ON DUPLICATE KEY UPDATE
+                cputimes = VALUES(cputimes),
+                snapshot_time_epoch = VALUES(snapshot_time_epoch)
+        """), [
+            {'host': h, 'pid': int(p), 'cputimes': int(c), 'snapshot_time_epoch': int(e)}
+            for h, p, c, e in last.itertuples(index=False)
+        ])
+    conn.execute(text(
+        "DELETE FROM load_summary_pid_state WHERE snapshot_time_epoch < :cutoff"
+    ), {'cutoff': watermark[0] - PID_STATE_RETENTION_SECS})
+    conn.execute(text("""
+        REPLACE INTO load_summary_watermark (name, snapshot_time_epoch, snapshot_datetime, updated_at)
+        VALUES ('load_summary', :epoch, :dt, NOW())
+    """), {'epoch': watermark[0], 'dt': watermark[1]})
+
+
+def count_folded(chunks, counts):
+    """Pass raw chunks through, appending each one's rows per (host,
+    snapshot_time_epoch) to `counts`."""
+    for chunk in chunks:
+        counts.append(chunk.groupby(['host', 'snapshot_time_epoch'], observed=True).size())
+        yield chunk
+
+
+def save_folded(conn, counts, watermark):
+    """Add a run's count_folded() counts to load_summary_folded and drop the
+    snapshots older than LATE_LOOKBACK_SECS (inside the caller's txn)."""
+    counts = [c for c in counts if not c.empty]
+    if counts:
+        folded = pd.concat(counts).groupby(level=[0, 1]).sum()
+        conn.execute(text("""
+            INSERT INTO load_summary_folded (host, snapshot_time_epoch, raw_rows)
+            VALUES (:host, :epoch, :rows)
+            ON DUPLICATE KEY UPDATE raw_rows = raw_rows + VALUES(raw_rows)
+        """), [{'host': str(h), 'epoch': int(e), 'rows': int(n)} for (h, e), n in folded.items()])
+    conn.execute(text(
+        "DELETE FROM load_summary_folded WHERE snapshot_time_epoch < :cutoff"
+    ), {'cutoff': watermark[0] - LATE_LOOKBACK_SECS})
+
+
+def read_watermark(engine):
+    with engine.connect() as conn:
+        return conn.execute(text(
+            "SELECT snapshot_time_epoch, snapshot_datetime FROM load_summary_watermark "
+            "WHERE name = 'load_summary'"
+        )).fetchone()
+
+
+def process_data(full=False):
+    """Fold new raw snapshots into load_summary.
+
+    By default only snapshots newer than the stored watermark are read; their
+    5-min buckets are upserted additively (load_summary values are sums, and
+    each snapshot is folded in exactly once), so runtime follows the amount of
+    new data. `full` (or a missing watermark) rebuilds the last 24 hours the
+    old way and re-seeds the incremental state."""
     try:
         engine = get_engine()
         ensure_table(engine)
+        ensure_state_tables(engine)
         update_process_summary(engine)
 
-        start = (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d %H:%M:%S')
-        end = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        logger.info(f"Processing data from {start} to {end}")
+        watermark = None if full else read_watermark(engine)
+        if watermark is None:
+            process_full(engine)
+        else:
+            process_incremental(engine, watermark)
+            refold_late_rows(engine, read_watermark(engine))
+        maintain_process_partitions(engine)
+
+    except Exception as e:
+        logger.error(f"data sync failed: {str(e)}")
+        raise
+
+
+def insert_summary(conn, summary):
+    summary[SUMMARY_COLUMNS].to_sql(
+        'load_summary', conn, if_exists='append', index=False,
+        method='multi', chunksize=500
+    )
+
+
+def upsert_summary(conn, summary):
+    """Add summary rows into load_summary, summing into buckets that exist."""
+    conn.execute(text("""
+        INSERT INTO load_summary (snapshot_datetime, host, username, comm, cpu_norm, rss, pss)
+        VALUES (:snapshot_datetime, :host, :username, :comm, :cpu_norm, :rss, :pss)
+        ON DUPLICATE KEY UPDATE
+            cpu_norm = cpu_norm + VALUES(cpu_norm),
+            rss = rss + VALUES(rss),
+            pss = pss + VALUES(pss)
+    """), [
+        {'snapshot_datetime': r.snapshot_datetime.to_pydatetime(), 'host': str(r.host),
+         'username': str(r.username), 'comm': str(r.comm), 'cpu_norm': float(r.cpu_norm),
+         'rss': float(r.rss), 'pss': float(r.pss)}
+        for r in summary[SUMMARY_COLUMNS].itertuples(index=False)
+    ])
+
+
+def _bucket_sql(secs):
+    # Floor snapshot_datetime to `secs` within its day (no time-zone conversion)
+    return (f"DATE(snapshot_datetime) + INTERVAL "
+            f"(TIME_TO_SEC(snapshot_datetime) DIV {secs}) * {secs} SECOND")
 
-        df = pd.read_sql(
-            f"SELECT * FROM processes WHERE snapshot_datetime BETWEEN '{start}' AND '{end}'",
-            con=engine
-        )
-        if df.empty:
+
+def refresh_rollups(conn, start, end):
+    """Recompute every rollup bucket overlapping [start, end) (inside the caller's txn).
+
+    Called with the range a run just wrote to load_summary; buckets are rebuilt
+    from scratch rather than added to, so refreshing a range twice is harmless."""
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    for table, secs, source in ROLLUPS:
+        start, end = start.floor(f'{secs}s'), end.ceil(f'{secs}s')
+        params = {'s': start.to_pydatetime(), 'e': end.to_pydatetime()}
+        bucket = _bucket_sql(secs)
+        where = "snapshot_datetime >= :s AND snapshot_datetime < :e"
+        if source == 'load_summary':
+            sums = "SUM(cpu_norm) AS cpu_norm, SUM(IF(pss > 0, pss, rss)) AS mem, COUNT(*) AS samples"
+            snapshots = (f"SELECT {bucket} AS b, host, COUNT(DISTINCT snapshot_datetime) AS snapshots "
+                         f"FROM load_summary WHERE {where} GROUP BY b, host")
+        else:
+            sums = "SUM(cpu_norm) AS cpu_norm, SUM(mem) AS mem, SUM(samples) AS samples"
+            snapshots = (f"SELECT {bucket} AS b, host, SUM(snapshots) AS snapshots FROM ("
+                         f"SELECT DISTINCT snapshot_datetime, host, snapshots FROM {source} "
+                         f"WHERE {where}) s GROUP BY b, host")
+        conn.execute(text(f"DELETE FROM {table} WHERE {where}"), params)
+        conn.execute(text(f"""
+            INSERT INTO {table} (snapshot_datetime, host, username, comm, cpu_norm, mem, samples, snapshots)
+            SELECT r.b, r.host, r.username, r.comm, r.cpu_norm, r.mem, r.samples, n.snapshots
+            FROM (SELECT {bucket} AS b, host, username, comm, {sums}
+                  FROM {source} WHERE {where} GROUP BY b, host, username, comm) r
+            JOIN ({snapshots}) n ON n.b = r.b AND n.host = r.host
+        """), params)
+
+
+def rebuild_rollups(engine, start, end):
+    """Rebuild the rollups for [start, end) from load_summary as it stands."""
+    with engine.begin() as conn:
+        refresh_rollups(conn, start, end)
+
+
+def rebuild_range(engine, start, end):
+    """Recompute load_summary for the half-open range [start, end) from raw data.
+
+    Used by backfill.py. The range's buckets (and the rollups over them) are rebuilt in one transaction;
+    seeding from the SEED_LOOKBACK before `start` keeps the first snapshot's
+    CPU deltas, and the half-open bounds let adjacent ranges run in parallel
+    without touching each other's buckets. Returns (raw_rows, summary_rows);
+    a range with no raw rows is left untouched."""
+    params = {'s': start, 'e': end, 'seed_from': start - SEED_LOOKBACK}
+    seed_columns = ['host', 'pid', 'cputimes', 'snapshot_time_epoch']
+    until = _archived_until()
+    seeds = []
+    if until is not None and params['seed_from'] < until:
+        seeds.append(archive.read(RAW_TABLE, params['seed_from'], min(start, until), seed_columns))
+    seeds.append(pd.read_sql(
+        text(f"SELECT {', '.join(seed_columns)} FROM {PROCESS_TABLE} "
+             "WHERE snapshot_datetime >= :seed_from AND snapshot_datetime < :s"),
+        con=engine, params=params
+    ))
+    seed = pd.concat([df for df in seeds if not df.empty] or seeds[-1:], ignore_index=True)
+    if not seed.empty:
+        seed = seed.sort_values('snapshot_time_epoch').groupby(['host', 'pid']).tail(1)
+
+    parts = []
+    _, watermark, raw_rows, summary_rows = aggregate_stream(iter_raw_range(engine, start, end), parts.append, seed)
+    if watermark is None:
+        return 0, 0
+    with engine.begin() as conn:
+        conn.execute(text(
+            "DELETE FROM load_summary WHERE snapshot_datetime >= :s AND snapshot_datetime < :e"
+        ), params)
+        for summary in parts:
+            insert_summary(conn, summary)
+        refresh_rollups(conn, start, end)
+    return raw_rows, summary_rows
+
+
+def process_full(engine):
+    start = (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d %H:%M:%S')
+    end = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    upper = int(time.time()) - SETTLE_SECS
+    logger.info(f"Full rebuild of data from {start} to {end}")
+
+    counts = []
+    chunks = count_folded(iter_raw_chunks(
+        engine, "snapshot_datetime BETWEEN :start AND :end AND snapshot_time_epoch <= :upper",
+        {'start': start, 'end': end, 'upper': upper}), counts)
+    # Delete existing data for this time range, stream the rebuilt buckets
+    # in, and re-seed the incremental state in one transaction
+    with engine.begin() as conn:
+        conn.execute(text(
+            "DELETE FROM load_summary WHERE snapshot_datetime >= :start"
+        ), {'start': start})
+        conn.execute(text("DELETE FROM load_summary_pid_state"))
+        conn.execute(text("DELETE FROM load_summary_folded"))
+        last, watermark, raw_rows, summary_rows = aggregate_stream(
+            chunks, lambda summary: insert_summary(conn, summary))
+        if watermark is None:
             logger.info("No data to process")
             return
+        refresh_rollups(conn, start, watermark[1] + timedelta(minutes=5))
+        save_state(conn, last, watermark)
+        save_folded(conn, counts, watermark)
+
+    logger.info(f"Wrote {summary_rows} rows to load_summary from {raw_rows} raw rows "
+                f"(watermark {watermark[1]})")
 
-        # Compute cpu_norm: normalized CPU usage (cores consumed per second)
-        # Filter out system/service accounts — only show real user load
-        exclude_users = {
-            'root', 'daemon', 'bin', 'sys', 'sync', 'games', 'man', 'lp', 'mail',
-            'news', 'uucp', 'proxy', 'www-data', 'backup', 'list', 'irc', 'gnats',
-            'nobody', 'systemd-network', 'systemd-resolve', 'syslog', 'messagebus',
-            '_apt', 'lxd', 'uuidd', 'dnsmasq', 'landscape', 'pollinate', 'sshd',
-            'sssd', 'statd', 'ntp', 'nagios', 'scan', 'sophosav', 'zabbix', 'tss',
-            'tcpdump', '_rpc', 'usbmux', 'avahi', 'netdata', 'gdm',
-            'gnome-remote-desktop', 'ntpsec', 'nx', 'polkitd', 'rstudio-server',
-            'sophos-spl-av', 'sophos-spl-local', 'sophos-spl-updatescheduler',
-            'sophos-spl-user',
-            'rtkit',
-            'munge',
-        }
-        df = df[~df['username'].isin(exclude_users)]
-        # Also exclude usernames that look like system accounts (sophos-*, etc.)
-        df = df[~df['username'].str.startswith('sophos-')]
-        # Exclude numeric-only usernames (unresolved UIDs)
-        df = df[~df['username'].str.match(r'^\d+$')]
-        if df.empty:
-            logger.info("No user data after filtering system accounts")
+
+def process_incremental(engine, watermark):
+    wm_epoch, wm_datetime = watermark
+    upper = int(time.time()) - SETTLE_SECS
+    seed = pd.read_sql(
+        text("SELECT host, pid, cputimes, snapshot_time_epoch FROM load_summary_pid_state"),
+        con=engine
+    )
+    # snapshot_datetime bound lets MySQL use the time index; epoch does the exact cut
+    counts = []
+    chunks = count_folded(iter_raw_chunks(
+        engine, "snapshot_datetime >= :wm_dt AND snapshot_time_epoch > :wm "
+                "AND snapshot_time_epoch <= :upper",
+        {'wm_dt': wm_datetime - DATETIME_SLACK, 'wm': wm_epoch, 'upper': upper}), counts)
+    buckets = []
+
+    def write(summary):
+        upsert_summary(conn, summary)
+        buckets.extend([summary['snapshot_datetime'].min(), summary['snapshot_datetime'].max()])
+
+    with engine.begin() as conn:
+        last, new_watermark, raw_rows, summary_rows = aggregate_stream(chunks, write, seed)
+        if new_watermark is None:
+            logger.info(f"No new snapshots since {wm_datetime}")
             return
+        # the buckets written, not wm_datetime..new watermark: local time runs
+        # backwards when DST ends
+        if buckets:
+            refresh_rollups(conn, min(buckets), max(buckets) + timedelta(minutes=5))
+        # only pids sampled in this run need their state rewritten
+        save_state(conn, last[last['snapshot_time_epoch'] > wm_epoch], new_watermark)
+        save_folded(conn, counts, new_watermark)
 
-        df = df.sort_values(by='snapshot_datetime', ascending=True)
-        df['rss'] = (df['rss'] / 1000000).round(4)  # KB to GB
-        if 'pss' in df.columns:
-            df['pss'] = (df['pss'] / 1000000).round(4)  # KB to GB
-        else:
-            df['pss'] = 0.0
-        df['cpu_diff'] = (df['cputimes'] - df.groupby(['host', 'pid'])['cputimes'].shift()).fillna(0)
-        df['seconds_diff'] = (df['snapshot_time_epoch'] -
-                              df.groupby(['host', 'pid'])['snapshot_time_epoch'].shift()).fillna(0)
-        df['cpu_norm'] = (df['cpu_diff'].div(df['seconds_diff'])).fillna(0).replace([float('inf'), float('-inf')], 0)
-        df = df[(df['cpu_norm'] > 0) & (df['cpu_norm'] < 10000)]  # Filter out unreasonable values
-
-        # Aggregate to 5-min buckets per (host, username, comm)
-        summary = df.groupby([
-            pd.Grouper(key='snapshot_datetime', freq='5min'),
-            'host', 'username', 'comm'
-        ]).agg(
-            cpu_norm=('cpu_norm', 'sum'),
-            rss=('rss', 'sum'),
-            pss=('pss', 'sum'),
-        ).reset_index()
-
-        summary = summary[(summary['cpu_norm'] > 0) | (summary['rss'] > 0)]
-        summary['cpu_norm'] = summary['cpu_norm'].round(4)
-        summary['rss'] = summary['rss'].round(4)
-        summary['pss'] = summary['pss'].round(4)
-
-        logger.info(f"Computed {len(summary)} summary rows")
-
-        # Delete existing data for this time range, then bulk insert
-        with engine.begin() as conn:
-            conn.execute(text(
-                "DELETE FROM load_summary WHERE snapshot_datetime >= :start"
-            ), {'start': start})
+    logger.info(f"Upserted {summary_rows} load_summary rows from {raw_rows} new raw rows "
+                f"({wm_datetime} -> {new_watermark[1]})")
 
-        summary[['snapshot_datetime', 'host', 'username', 'comm', 'cpu_norm', 'rss', 'pss']].to_sql(
-            'load_summary', engine, if_exists='append', index=False,
-            method='multi', chunksize=500
-        )
 
-        logger.info(f"Wrote {len(summary)} rows to load_summary")
 
-    except Exception as e:
-        logger.error(f"data sync failed: {str(e)}")
-        raise
+def refold_late_rows(engine, watermark):
+    """Rebuild the 5-min buckets that gained raw rows after the watermark had
+    passed them (within LATE_LOOKBACK_SECS), from the raw rows as they stand.
+
+    A bucket that still holds rows newer than the watermark is left for a
+    later run, so rebuild_range never folds in rows the next incremental run
+    will add again."""
+    wm_epoch, wm_datetime = watermark
+    params = {'lb_dt': wm_datetime - timedelta(seconds=LATE_LOOKBACK_SECS) - DATETIME_SLACK,
+              'lb': wm_epoch - LATE_LOOKBACK_SECS, 'wm': wm_epoch}
+    raw = pd.read_sql(text(
+        "SELECT host, snapshot_time_epoch, MIN(snapshot_datetime) AS snapshot_datetime, COUNT(*) AS raw_rows "
+        f"FROM {PROCESS_TABLE} WHERE snapshot_datetime >= :lb_dt AND snapshot_time_epoch > :lb "
+        "AND snapshot_time_epoch <= :wm AND pid IS NOT NULL GROUP BY host, snapshot_time_epoch"
+    ), con=engine, params=params)
+    folded = pd.read_sql(text(
+        "SELECT host, snapshot_time_epoch, raw_rows AS folded_rows FROM load_summary_folded "
+        "WHERE snapshot_time_epoch > :lb"
+    ), con=engine, params=params)
+    if folded.empty:
+        return  # nothing recorded yet (first run with this table)
+    raw = raw.merge(folded, on=['host', 'snapshot_time_epoch'], how='left').fillna({'folded_rows': 0})
+    late = raw[raw['raw_rows'] > raw['folded_rows']]
+    if late.empty:
+        return
+    logger.warning(f"{int((late['raw_rows'] - late['folded_rows']).sum())} raw rows from "
+                   f"{len(late)} host snapshots arrived after the watermark passed them")
+    for bucket in sorted(pd.to_datetime(late['snapshot_datetime']).dt.floor('5min').unique()):
+        start, end = pd.Timestamp(bucket).to_pydatetime(), (pd.Timestamp(bucket) + timedelta(minutes=5)).to_pydatetime()
+        with engine.connect() as conn:
+            newest = conn.execute(text(
+                f"SELECT MAX(snapshot_time_epoch) FROM {PROCESS_TABLE} "
+                "WHERE snapshot_datetime >= :s AND snapshot_datetime < :e"
+            ), {'s': start, 'e': end}).scalar()
+        if newest is not None and newest > wm_epoch:
+            logger.info(f"Deferring late rows in {start}: bucket not behind the watermark yet")
+            continue
+        raw_rows, summary_rows = rebuild_range(engine, start, end)
+        in_bucket = raw[(pd.to_datetime(raw['snapshot_datetime']) >= start)
+                        & (pd.to_datetime(raw['snapshot_datetime']) < end)]
+        with engine.begin() as conn:
+            conn.execute(text("""
+                REPLACE INTO load_summary_folded (host, snapshot_time_epoch, raw_rows)
+                VALUES (:host, :epoch, :rows)
+            """), [{'host': r.host, 'epoch': int(r.snapshot_time_epoch), 'rows': int(r.raw_rows)}
+                   for r in in_bucket.itertuples(index=False)])
+        logger.info(f"Rebuilt {start} from {raw_rows} raw rows ({summary_rows} load_summary rows)")
 
 
 if __name__ == "__main__":
-    process_data()
+    if '--partition-processes' in sys.argv[1:]:
+        partition_processes(get_engine())
+    elif '--migrate-to-compact' in sys.argv[1:]:
+        migrate_to_compact(get_engine())
+    else:
+        process_data(full='--full' in sys.argv[1:])
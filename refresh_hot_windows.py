@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""Cron job, run after process_data_job.py: pre-builds the dashboard's payloads
+for the hot windows and publishes them to the hot_payloads table.
+
+A hot window is the last 1, 14 or 30 days, as the date pickers ask for it
+(start = end - N days, end = today). The browser computes "today" in UTC, so
+windows are built for both the UTC date and the America/Los_Angeles date when
+the two differ. For each window, overview, per-user, analytics and
+slurm-efficiency are built and encoded exactly as api_server would, and stored
+under api_server's cache key. api_server serves them from there on a cache
+miss instead of running its pipeline (see api_server._materialized). The
+time-series endpoints are also published downsampled to CHART_POINTS, the
+key the dashboard's charts actually request.
+
+A run that is still going when cron starts the next one makes the new run
+exit at once (see LOCK_FILE).
+"""
+import fcntl
+import logging
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import text
+
+import api_server
+from api_server import CHART_POINTS, _cache_key, _encode, _parse_dates, get_engine
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.FileHandler('/tmp/load_analyzer_hot_windows.log'),
+        logging.StreamHandler(sys.stdout)
+    ]
+)
+logger = logging.getLogger(__name__)
+
+HOT_WINDOW_DAYS = (1, 14, 30)
+
+# endpoint -> (payload builder, response formats clients ask it for,
+#              downsampler for its ?points= variant or None)
+ENDPOINTS = {
+    'overview': (api_server._overview_payload, ('json', 'columnar'), api_server._downsample_overview),
+    'per-user': (api_server._per_user_payload, ('json', 'columnar'), api_server._downsample_per_user),
+    'analytics': (api_server._analytics_payload, ('json',), None),
+    'slurm-efficiency': (api_server._slurm_efficiency_payload, ('json',), None),
+}
+
+LOCK_FILE = '/tmp/load_analyzer_hot_windows.lock'
+
+# Rows for windows that have rolled off are dropped after this long
+PRUNE_AFTER_HOURS = 24
+
+
+def ensure_table(engine):
+    with engine.begin() as conn:
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS hot_payloads (
+                cache_key VARCHAR(128) NOT NULL,
+                encoding VARCHAR(16) NOT NULL,
+                body LONGBLOB NOT NULL,
+                updated_at DATETIME NOT NULL,
+                PRIMARY KEY (cache_key, encoding)
+            )
+        """))
+
+
+def hot_windows():
+    """(start, end) date strings of every hot window, as the frontend sends them."""
+    today = {datetime.now(timezone.utc).date(),
+             datetime.now(ZoneInfo('America/Los_Angeles')).date()}
+    for end in sorted(today):
+        for days in HOT_WINDOW_DAYS:
+            yield (end - timedelta(days=days)).isoformat(), end.isoformat()
+
+
+def publish(engine, key, variants):
+    """Replace key's variants in one transaction, so readers never see a mix."""
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM hot_payloads WHERE cache_key = :key"), {'key': key})
+        conn.execute(
+            text("INSERT INTO hot_payloads (cache_key, encoding, body, updated_at) "
+                 "VALUES (:key, :encoding, :body, NOW())"),
+            [{'key': key, 'encoding': enc, 'body': body} for enc, body in variants.items()]
+        )
+
+
+def refresh():
+    with open(LOCK_FILE, 'w') as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            logger.warning("Previous refresh still running; skipping this one")
+            return
+        _refresh()
+
+
+def _refresh():
+    engine = get_engine()
+    ensure_table(engine)
+    started = time.perf_counter()
+    published = failed = 0
+    for start, end in hot_windows():
+        start_str, end_str = _parse_dates(start, end)
+        for endpoint, (build, formats, downsample) in ENDPOINTS.items():
+            t0 = time.perf_counter()
+            try:
+                data = build(start_str, end_str)
+                for fmt in formats:
+                    publish(engine, _cache_key(endpoint, start_str, end_str, fmt), _encode(data, fmt))
+                if downsample is not None:
+                    thin = downsample(data, CHART_POINTS)
+                    for fmt in formats:
+                        publish(engine, _cache_key(endpoint, start_str, end_str, fmt, CHART_POINTS),
+                                _encode(thin, fmt))
+            except Exception:
+                logger.exception(f"Failed to build {endpoint} for {start}..{end}")
+                failed += 1
+                continue
+            published += 1
+            logger.info(f"Published {endpoint} {start}..{end} in {time.perf_counter() - t0:.1f}s")
+
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM hot_payloads WHERE updated_at < NOW() - INTERVAL :hours HOUR"),
+                     {'hours': PRUNE_AFTER_HOURS})
+    logger.info(f"Refreshed {published} hot payloads ({failed} failed) "
+                f"in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    refresh()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""Daily cron job: moves raw rows past their retention out of MySQL into the
+Parquet archive (app/archive.py).
+
+Each expired day is exported first and removed from MySQL only after its
+export is complete: `processes` a whole daily partition at a time (DROP
+PARTITION, see app/partitions.py), compact storage's process_samples and
+`slurm_node_alloc` with a range DELETE on their snapshot_datetime index. A run that dies in between leaves
+the day in both places, and the next run re-exports and removes it.
+
+Retention is opt-in per table (PROCESS_RETENTION_DAYS,
+SLURM_NODE_ALLOC_RETENTION_DAYS in app/config.py); with both unset this does
+nothing.
+"""
+import logging
+import time
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+from sqlalchemy import text
+
+from app import archive
+from app.config import PROCESS_RETENTION_DAYS, PROCESS_TABLE, SLURM_NODE_ALLOC_RETENTION_DAYS
+from app.partitions import PARTITIONS_SQL, TABLE as RAW_TABLE, drop_partitions_sql, partition_day
+from process_data_job import get_engine
+
+logger = logging.getLogger(__name__)
+
+
+def _first_day(engine, table: str):
+    with engine.connect() as conn:
+        first = conn.execute(text(f"SELECT MIN(snapshot_datetime) FROM {table}")).scalar()
+    return None if first is None else pd.Timestamp(first).date()
+
+
+def _export(engine, table: str, first: date, last: date, source: str = None):
+    """Export the days first..last of `table` (read from `source`), oldest first."""
+    day = first
+    while day <= last:
+        t0 = time.time()
+        rows = archive.export_day(engine, table, day, source)
+        logger.info(f"Archived {rows} {table} rows for {day} in {time.time() - t0:.1f}s")
+        day += timedelta(days=1)
+
+
+def _archive_by_day(engine, table: str, cutoff: date, archived_as: str = None, source: str = None):
+    """Delete `table`'s rows older than cutoff a day at a time, each day once
+    it is archived as `archived_as` (default `table`) from `source` (default
+    `table`). Returns whether anything was deleted."""
+    deleted_any = False
+    day = _first_day(engine, table)
+    while day is not None and day < cutoff:
+        _export(engine, archived_as or table, day, day, source)
+        start = datetime.combine(day, datetime.min.time())
+        with engine.begin() as conn:
+            deleted = conn.execute(text(
+                f"DELETE FROM {table} WHERE snapshot_datetime >= :s AND snapshot_datetime < :e"
+            ), {'s': start, 'e': start + timedelta(days=1)}).rowcount
+        logger.info(f"Deleted {deleted} {table} rows for {day}")
+        deleted_any = True
+        day = _first_day(engine, table)
+    return deleted_any
+
+
+def archive_processes(engine):
+    """Archive and remove the raw process rows older than PROCESS_RETENTION_DAYS."""
+    if PROCESS_RETENTION_DAYS is None:
+        return
+    cutoff = date.today() - timedelta(days=PROCESS_RETENTION_DAYS)
+    if PROCESS_TABLE != RAW_TABLE:
+        archive_compact_processes(engine, cutoff)
+        return
+    with engine.connect() as conn:
+        names = list(conn.execute(text(PARTITIONS_SQL)).scalars())
+    days = {partition_day(name): name for name in names if partition_day(name) is not None}
+    if not days:
+        logger.warning(f"{RAW_TABLE} is not partitioned; run process_data_job.py --partition-processes "
+                       "before enabling PROCESS_RETENTION_DAYS")
+        return
+    expired = sorted(day for day in days if day < cutoff)
+    if not expired:
+        return
+    first = _first_day(engine, RAW_TABLE)
+    if first is not None:
+        # The oldest partition also holds anything before its day
+        _export(engine, RAW_TABLE, min(first, expired[-1]), expired[-1])
+    with engine.begin() as conn:
+        conn.execute(text(drop_partitions_sql([days[day] for day in expired])))
+    logger.info(f"Dropped {len(expired)} {RAW_TABLE} partitions older than {cutoff}")
+
+
+def archive_compact_processes(engine, cutoff: date):
+    """Compact storage: archive processes_compact's rows (as `processes`),
+    delete their process_samples, then the identities no sample refers to."""
+    if not _archive_by_day(engine, 'process_samples', cutoff, archived_as=RAW_TABLE, source=PROCESS_TABLE):
+        return
+    with engine.begin() as conn:
+        deleted = conn.execute(text(
+            "DELETE i FROM process_identity i LEFT JOIN process_samples s ON s.identity_id = i.id "
+            "WHERE s.identity_id IS NULL"
+        )).rowcount
+    logger.info(f"Deleted {deleted} process_identity rows with no samples left")
+
+
+def archive_slurm_node_alloc(engine):
+    """Archive and delete the `slurm_node_alloc` rows older than
+    SLURM_NODE_ALLOC_RETENTION_DAYS, a day at a time."""
+    if SLURM_NODE_ALLOC_RETENTION_DAYS is None:
+        return
+    _archive_by_day(engine, 'slurm_node_alloc', date.today() - timedelta(days=SLURM_NODE_ALLOC_RETENTION_DAYS))
+
+
+def run():
+    engine = get_engine()
+    archive_processes(engine)
+    archive_slurm_node_alloc(engine)
+
+
+if __name__ == "__main__":
+    run()
@@ -10,13 +10,13 @@ node is drained. "User's max" = GrpTRES quota on the main partition.
 """
 import json
 import re
-import subprocess
 import sys
 from datetime import datetime
 
 from sqlalchemy import create_engine, text
 
 from app.config import DB_CONFIG
+from app.ssh_pool import SSHPool
 
 SLURM_HOST = 'ibss-genomics'
 SLURM_USER = 'loadmon'
@@ -26,11 +26,13 @@ ACCEPTING_BASE = {'IDLE', 'MIXED', 'ALLOCATED'}  # base states that can run jobs
 BLOCKED_FLAGS = ('DRAIN', 'DOWN', 'NOT_RESPONDING', 'FAIL', 'POWERED_DOWN', 'POWERING')
 
 
+# The three per-minute commands (two squeue, one sacctmgr) share one persistent
+# master, which also survives from one cron run to the next.
+SSH_POOL = SSHPool(SLURM_USER, KEY, ['-o', 'StrictHostKeyChecking=accept-new', '-o', 'BatchMode=yes'])
+
+
 def ssh(cmd):
-    r = subprocess.run(
-        ['ssh', '-i', KEY, '-o', 'StrictHostKeyChecking=accept-new', '-o', 'BatchMode=yes',
-         f'{SLURM_USER}@{SLURM_HOST}', cmd],
-        capture_output=True, text=True, timeout=60)
+    r = SSH_POOL.run(SLURM_HOST, cmd, timeout=60)
     if r.returncode != 0:
         raise RuntimeError(f"ssh '{cmd}' failed: {r.stderr.strip()}")
     return r.stdout
@@ -1,11 +1,11 @@
 #!/usr/bin/env python3
 """Collects Slurm job data via sacct and stores in MySQL for allocation efficiency analysis."""
 import logging
-import subprocess
 import sys
 from datetime import datetime, timedelta
 from sqlalchemy import create_engine, text
 from app.config import DB_CONFIG
+from app.ssh_pool import SSHPool
 
 logging.basicConfig(
     level=logging.INFO,
@@ -19,6 +19,8 @@ logger = logging.getLogger(__name__)
 
 SLURM_HOST = 'ibss-genomics'
 SLURM_USER = 'loadmon'
+SSH_POOL = SSHPool(SLURM_USER, '/admin/monitor-keys/monitor_ed25519',
+                   ['-o', 'StrictHostKeyChecking=accept-new'])
 LOOKBACK_DAYS = 1  # per-run window; run hourly so overlapping windows keep data fresh
 
 
@@ -137,13 +139,12 @@ def collect_jobs():
     start_date = (datetime.now() - timedelta(days=LOOKBACK_DAYS)).strftime('%Y-%m-%d')
 
     sacct_cmd = (
-        f"ssh -i /admin/monitor-keys/monitor_ed25519 -o StrictHostKeyChecking=accept-new {SLURM_USER}@{SLURM_HOST} "
-        f"\"sacct --starttime={start_date} --allusers --noheader -P "
-        f"--format=JobID,User,Partition,AllocCPUS,ReqMem,MaxRSS,Elapsed,State,NodeList,Submit,Start,End,TotalCPU\""
+        f"sacct --starttime={start_date} --allusers --noheader -P "
+        f"--format=JobID,User,Partition,AllocCPUS,ReqMem,MaxRSS,Elapsed,State,NodeList,Submit,Start,End,TotalCPU"
     )
 
-    logger.info(f"Running: {sacct_cmd}")
-    result = subprocess.run(sacct_cmd, shell=True, capture_output=True, text=True, timeout=120)
+    logger.info(f"Running on {SLURM_HOST}: {sacct_cmd}")
+    result = SSH_POOL.run(SLURM_HOST, sacct_cmd, timeout=120)
 
     if result.returncode != 0:
         logger.error(f"sacct failed: {result.stderr}")
@@ -0,0 +1,59 @@
+import pandas as pd
+import pytest
+
+import api_server
+
+HOST, _, MEM_LIMIT = api_server.SERVERS[0]
+
+
+def load_summary_rows(days=2):
+    """A steady load on HOST: 8 cores and 40 GB per 5-min snapshot, split
+    between two users that take turns, so no single user is in every snapshot."""
+    times = pd.date_range('2026-03-01', periods=days * 288, freq='5min')
+    rows = []
+    for i, ts in enumerate(times):
+        user = 'alice' if i % 2 else 'bob'
+        rows.append((ts, HOST, user, 'python3', 6.0, 0.0, 30.0))
+        rows.append((ts, HOST, 'carol', 'blastn', 2.0, 10.0, 0.0))
+    return pd.DataFrame(rows, columns=['snapshot_datetime', 'host', 'username', 'comm', 'cpu_norm', 'rss', 'pss'])
+
+
+def rollup_30m(df):
+    """What process_data_job.refresh_rollups stores in load_summary_30m."""
+    df = df.assign(mem=df['pss'].where(df['pss'] > 0, df['rss']),
+                   snapshot_datetime=df['snapshot_datetime'].dt.floor('30min'))
+    out = df.groupby(['snapshot_datetime', 'host', 'username', 'comm']).agg(
+        cpu_norm=('cpu_norm', 'sum'), mem=('mem', 'sum')).reset_index()
+    return out.assign(snapshots=6)
+
+
+@pytest.fixture
+def summary(monkeypatch):
+    df = load_summary_rows()
+    tables = {'load_summary': df, 'load_summary_30m': rollup_30m(df)}
+    source = {'table': 'load_summary'}
+    monkeypatch.setattr(api_server, '_summary_source',
+                        lambda bucket, start_str: ('30min', source['table']) if source['table'] != 'load_summary'
+                        else ('5min', 'load_summary'))
+    monkeypatch.setattr(api_server, '_query_df', lambda sql, params: tables[source['table']].copy())
+    return source
+
+
+def host_peaks(bucket):
+    df = api_server._load_summary_df('2026-03-01 00:00:00', '2026-03-03 00:00:00', bucket)
+    by_time = df.groupby('snapshot_datetime')[['cpu_norm', 'mem']].sum()
+    return round(by_time['cpu_norm'].max(), 6), round(by_time['mem'].max(), 6)
+
+
+def test_steady_load_has_the_same_peak_at_every_bucket_size(summary):
+    peaks = {bucket: host_peaks(bucket) for bucket in ('5min', '15min', '30min')}
+    summary['table'] = 'load_summary_30m'
+    peaks['30min rollup'] = host_peaks('30min')
+    assert set(peaks.values()) == {(8.0, 40.0)}, peaks
+
+
+def test_chart_buckets_stop_at_30min():
+    assert api_server._resample_bucket('2026-01-01 00:00:00', '2026-03-01 00:00:00') == '30min'
+    assert api_server._resample_bucket('2025-01-01 00:00:00', '2026-03-01 00:00:00') == '30min'
+    assert api_server._analytics_bucket('2026-01-01 00:00:00', '2026-03-01 00:00:00') == '2h'
+    assert api_server._analytics_bucket('2025-01-01 00:00:00', '2026-03-01 00:00:00') == '1D'
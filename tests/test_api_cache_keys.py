@@ -0,0 +1,18 @@
+import asyncio
+import datetime
+
+import api_server
+
+
+def test_warm_cache_fills_the_key_the_overview_tab_requests(monkeypatch):
+    keys = []
+    monkeypatch.setattr(api_server, '_cached_response', lambda ck, *args: keys.append(ck))
+    asyncio.run(api_server.warm_cache())
+
+    # What OverviewTab asks for on first load (App.jsx's default dates, useServerData's query)
+    now = datetime.datetime.now(datetime.timezone.utc)
+    api_server.get_overview(start=(now - datetime.timedelta(days=14)).strftime('%Y-%m-%d'),
+                            end=now.strftime('%Y-%m-%d'), since=None, points=api_server.CHART_POINTS,
+                            accept=api_server.COLUMNAR_MEDIA_TYPE)
+    assert len(keys) == 2
+    assert keys[0] == keys[1]
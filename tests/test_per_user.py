@@ -0,0 +1,76 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+import api_server
+
+
+def baseline_per_user(df):
+    """/api/per-user's series and top consumers as built before _user_series,
+    one .loc lookup per timestamp per user."""
+    servers_result, top_consumers = [], []
+    for hostname, cpu_limit, mem_limit in api_server.SERVERS:
+        host_df = df[df['host'] == hostname]
+        if host_df.empty:
+            continue
+        server_entry = {"hostname": hostname, "cpu_limit": cpu_limit, "mem_limit": mem_limit,
+                        "cpu_by_user": None, "mem_by_user": None}
+        for col, key in (('cpu_norm', 'cpu_by_user'), ('mem', 'mem_by_user')):
+            by_user = host_df.groupby(['snapshot_datetime', 'username'])[col].sum().reset_index()
+            user_totals = by_user.groupby('username')[col].sum().sort_values(ascending=False)
+            top_users = list(user_totals.index[:10])
+            if len(user_totals) > 10:
+                by_user.loc[~by_user['username'].isin(top_users), 'username'] = 'other'
+                by_user = by_user.groupby(['snapshot_datetime', 'username'])[col].sum().reset_index()
+                top_users.append('other')
+            all_ts = sorted(by_user['snapshot_datetime'].unique())
+            series = {}
+            for user in top_users:
+                ud = by_user[by_user['username'] == user].set_index('snapshot_datetime')
+                series[user] = [round(float(ud.loc[t, col]), 2) if t in ud.index else 0 for t in all_ts]
+            server_entry[key] = {"timestamps": [pd.Timestamp(t).strftime('%Y-%m-%dT%H:%M:%S') for t in all_ts],
+                                 "users": top_users, "series": series}
+
+        agg = host_df.groupby('username').agg(avg_cpu=('cpu_norm', 'mean'), peak_cpu=('cpu_norm', 'max')).reset_index()
+        for _, row in agg.iterrows():
+            top_consumers.append({"server": hostname, "user": row['username'],
+                                  "avg_cpu": round(float(row['avg_cpu']), 1),
+                                  "peak_cpu": round(float(row['peak_cpu']), 1), "avg_mem": None, "peak_mem": None})
+        agg_mem = host_df.groupby('username').agg(avg_mem=('mem', 'mean'), peak_mem=('mem', 'max')).reset_index()
+        for _, row in agg_mem.iterrows():
+            existing = [c for c in top_consumers if c['server'] == hostname and c['user'] == row['username']]
+            existing[0]['avg_mem'] = round(float(row['avg_mem']), 1)
+            existing[0]['peak_mem'] = round(float(row['peak_mem']), 1)
+        servers_result.append(server_entry)
+    top_consumers.sort(key=lambda x: x.get('peak_cpu') or 0, reverse=True)
+    return {"servers": servers_result, "top_consumers": top_consumers}
+
+
+def summary_rows(seed=0):
+    """Per-(bucket, host, user, comm) rows: 14 users (so some fold into
+    'other'), users missing from many buckets, and values on rounding ties."""
+    rng = np.random.default_rng(seed)
+    times = pd.date_range('2026-03-01', periods=200, freq='30min')
+    hosts = [host for host, _, _ in api_server.SERVERS[:3]]
+    users = [f'user{i}' for i in range(14)]
+    n = 4000
+    df = pd.DataFrame({
+        'snapshot_datetime': rng.choice(times, n),
+        'host': rng.choice(hosts, n),
+        'username': rng.choice(users, n, p=np.linspace(14, 1, 14) / np.linspace(14, 1, 14).sum()),
+        'comm': rng.choice(['python3', 'blastn', 'R'], n),
+        'cpu_norm': rng.random(n) * 20,
+        'mem': rng.random(n) * 200,
+    })
+    ties = rng.random(n) < 0.3  # x.xx5-style values, where float rounding methods disagree
+    df.loc[ties, 'cpu_norm'] = np.round(df.loc[ties, 'cpu_norm'], 2) + 0.005
+    df.loc[ties, 'mem'] = np.round(df.loc[ties, 'mem'], 1) + 0.05
+    return df.drop_duplicates(['snapshot_datetime', 'host', 'username', 'comm'])
+
+
+def test_per_user_payload_matches_baseline(monkeypatch):
+    df = summary_rows()
+    monkeypatch.setattr(api_server, '_load_summary_df', lambda start_str, end_str, bucket: df.copy())
+    payload = api_server._per_user_payload('2026-03-01 00:00:00', '2026-03-06 00:00:00')
+    assert json.dumps(payload) == json.dumps(baseline_per_user(df))
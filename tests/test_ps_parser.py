@@ -0,0 +1,79 @@
+from app.ps_parser import PsRecord, parse_line, parse_ps
+
+HEADER = ("|    PID    PID |    PID    PPID |    PID USER     |    PID COMMAND         |    PID  TIME "
+          "|    PID   RSS |    PID    VSZ |    PID NLWP |    PID ELAPSED |    PID  START |    PID COMMAND")
+
+
+def ps_line(pid=4242, ppid=1, user='alice', comm='python3', cputimes=120, rss=2048, vsz=8192,
+            thcount=4, etimes=600, start='Mar 23', args='python3 train.py --epochs 10'):
+    values = (pid, ppid, user, comm, cputimes, rss, vsz, thcount, etimes, start, args)
+    return ''.join(f"| {pid:>6} {value} " for value in values).rstrip()
+
+
+def test_parse_line_fields_types_and_order():
+    rec = parse_line(ps_line())
+    assert rec == PsRecord(4242, 1, 'alice', 'python3', 120, 2048, 0, 8192, 4, 600, 'Mar 23',
+                           'python3 train.py --epochs 10')
+    assert PsRecord._fields == ('pid', 'ppid', 'username', 'comm', 'cputimes', 'rss', 'pss', 'vsz',
+                                'thcount', 'etimes', 'bdstart', 'args')
+    for name in ('pid', 'ppid', 'cputimes', 'rss', 'pss', 'vsz', 'thcount', 'etimes'):
+        assert type(getattr(rec, name)) is int, name
+    for name in ('username', 'comm', 'bdstart', 'args'):
+        assert type(getattr(rec, name)) is str, name
+
+
+def test_parse_line_keeps_pipe_in_args():
+    rec = parse_line(ps_line(args="bash -c 'ps aux | grep x | wc -l'"))
+    assert rec.args == "bash -c 'ps aux | grep x | wc -l'"
+    assert rec.bdstart == 'Mar 23'
+
+
+def test_parse_line_collapses_whitespace():
+    rec = parse_line(ps_line(start='Mar  3', args='sleep    10'))
+    assert rec.bdstart == 'Mar 3'
+    assert rec.args == 'sleep 10'
+
+
+def test_parse_line_rejects_short_and_malformed_lines():
+    line = ps_line()
+    assert parse_line('') is None
+    assert parse_line(line[:line.index('| ', 60)]) is None  # truncated mid-listing
+    assert parse_line(ps_line(cputimes='1:02')) is None  # non-numeric field
+    assert parse_line(ps_line(rss='')) is None
+    assert parse_line(HEADER) is None
+
+
+def test_parse_ps_skips_header_and_blank_lines():
+    lines = [HEADER, '', ps_line(pid=1), '   ', ps_line(pid=2)]
+    assert [rec.pid for rec in parse_ps(lines)] == [1, 2]
+
+
+def test_parse_ps_first_line_is_always_the_header():
+    assert list(parse_ps([ps_line(pid=1)])) == []
+    assert list(parse_ps([])) == []
+
+
+def test_parse_ps_skips_malformed_lines():
+    lines = [HEADER, ps_line(pid=1), 'garbage | line', ps_line(pid=2, cputimes='x'), ps_line(pid=3)[:40],
+             ps_line(pid=4, vsz='x'), ps_line(pid=5)]
+    assert [rec.pid for rec in parse_ps(lines)] == [1, 5]
+
+
+def test_parse_ps_min_cputimes():
+    lines = [HEADER, ps_line(pid=1, cputimes=0), ps_line(pid=2, cputimes=9), ps_line(pid=3, cputimes=10)]
+    assert [rec.pid for rec in parse_ps(lines, min_cputimes=10)] == [3]
+    assert [rec.pid for rec in parse_ps(lines)] == [1, 2, 3]
+
+
+def test_parse_ps_exclude_users_and_processes():
+    lines = [HEADER, ps_line(pid=1, user='root'), ps_line(pid=2, comm='sshd'),
+             ps_line(pid=3, user='alice', comm='sshd-session'), ps_line(pid=4, user='rootless')]
+    recs = parse_ps(lines, exclude_users=frozenset({'root'}), exclude_processes=frozenset({'sshd'}))
+    assert [rec.pid for rec in recs] == [3, 4]
+
+
+def test_parse_ps_filters_apply_together():
+    lines = [HEADER, ps_line(pid=1, user='root', cputimes=500), ps_line(pid=2, cputimes=1),
+             ps_line(pid=3, comm='systemd', cputimes=500), ps_line(pid=4, cputimes=500)]
+    recs = parse_ps(lines, 10, frozenset({'root'}), frozenset({'systemd'}))
+    assert list(recs) == [parse_line(lines[4])]